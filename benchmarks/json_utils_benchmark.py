@@ -0,0 +1,90 @@
+"""
+Micro-benchmark of serializing typical DynamoDB derived payloads with the
+stdlib JSON module and the aws_lambda_powertools `Encoder` (previously used
+throughout this library) against `ppaya_lambda_utils.json_utils` with each
+of its backends.
+
+Usage::
+
+    python benchmarks/json_utils_benchmark.py
+"""
+from decimal import Decimal
+import json
+import timeit
+from typing import Any, Callable, Dict, List
+
+from aws_lambda_powertools.shared.json_encoder import Encoder
+
+from ppaya_lambda_utils import json_utils
+
+
+NUMBER = 200
+
+
+def make_item(x: int) -> Dict[str, Any]:
+    """
+    An item as returned by boto3 from DynamoDB, with numbers as Decimals.
+    """
+    return {
+        'PK': f'CUSTOMER#{x}',
+        'SK': f'ORDER#{x:08d}',
+        'id': f'2b3f8c1e-6a4d-4f1b-9c7e-{x:012d}',
+        'customerName': 'Some Customer Name',
+        'email': f'customer-{x}@example.com',
+        'createdAt': '2022-03-04T05:06:07.000008+00:00',
+        'total': Decimal('1234.56'),
+        'quantity': Decimal(x),
+        'isActive': True,
+        'tags': ['a', 'b', 'c'],
+        'lines': [
+            {'sku': f'SKU-{y}', 'price': Decimal('9.99'), 'quantity': Decimal(y)}
+            for y in range(5)
+        ],
+    }
+
+
+def powertools_sns_message(payload: Any) -> str:
+    return json.dumps({'default': json.dumps(payload, cls=Encoder)})
+
+
+def json_utils_sns_message(payload: Any) -> str:
+    return json_utils.dumps({'default': json_utils.dumps(payload)})
+
+
+def run(func: Callable[[Any], Any], payload: Any) -> float:
+    seconds = min(timeit.repeat(lambda: func(payload), number=NUMBER, repeat=5))
+    return seconds / NUMBER * 1_000_000
+
+
+def main() -> None:
+    payloads: Dict[str, Any] = {
+        'single item': make_item(1),
+        '100 items': [make_item(x) for x in range(100)],
+    }
+    results: List[List[str]] = [
+        ['payload', 'serializer', 'backend', 'microseconds', 'speed up']]
+
+    for payload_name, payload in payloads.items():
+        for serializer, baseline_func, func in [
+                ('dumps', lambda p: json.dumps(p, cls=Encoder), json_utils.dumps),
+                ('sns message', powertools_sns_message, json_utils_sns_message)]:
+            baseline = run(baseline_func, payload)
+            results.append([
+                payload_name, serializer, 'powertools Encoder', f'{baseline:.1f}', '1.0'])
+            for backend in ['json', 'orjson']:
+                try:
+                    json_utils.set_json_backend(backend)
+                except ImportError:
+                    continue
+                duration = run(func, payload)
+                results.append([
+                    payload_name, serializer, f'json_utils ({backend})',
+                    f'{duration:.1f}', f'{baseline / duration:.1f}'])
+
+    widths = [max(len(row[x]) for row in results) for x in range(len(results[0]))]
+    for row in results:
+        print('  '.join(value.ljust(width) for value, width in zip(row, widths)))
+
+
+if __name__ == '__main__':
+    main()
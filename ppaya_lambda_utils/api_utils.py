@@ -1,6 +1,7 @@
-import json
 from typing import Any, Dict
 
+from ppaya_lambda_utils import json_utils
+
 
 def create_api_response(
         body: Dict[str, Any], status_code: int = 200) -> Dict[str, Any]:
@@ -14,5 +15,5 @@ def create_api_response(
 
     return {
         'statusCode': status_code,
-        'body': json.dumps(body),
+        'body': json_utils.dumps(body),
     }
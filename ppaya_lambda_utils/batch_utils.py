@@ -0,0 +1,271 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+import random
+import time
+from typing import Any, Callable, Dict, List, Mapping, Sequence, TypeVar
+
+from ppaya_lambda_utils.concurrency_utils import DEFAULT_MAX_WORKERS, map_concurrently
+from ppaya_lambda_utils.deadline_utils import DEFAULT_MIN_REMAINING_TIME_MS, has_time_remaining
+from ppaya_lambda_utils.exceptions import BatchEntryTooLargeException, DeadlineExceededException
+
+
+Entry = Mapping[str, Any]
+E = TypeVar('E', bound=Entry)
+
+# The maximum total size of the messages in an SQS or SNS batch request.
+MAX_BATCH_BYTES: int = 256 * 1024
+
+# Error codes of failed entries which are worth retrying, even if AWS reports
+# them as a sender fault.
+RETRYABLE_ERROR_CODES = frozenset([
+    'InternalError',
+    'InternalFailure',
+    'KMSThrottlingException',
+    'RequestThrottled',
+    'ServiceUnavailable',
+    'Throttling',
+    'ThrottlingException',
+    'TooManyRequestsException',
+])
+
+
+@dataclass
+class BatchResult:
+    """
+    The result of sending entries to AWS in batches, eg with
+    `send_to_sqs_concurrently`.
+    """
+    # The id of the message created for each successful entry, keyed by the
+    # entry `Id`.
+    message_ids: Dict[str, str] = field(default_factory=dict)
+    # Entries that could not be sent.  Each has the `Id`, `Code`, `Message`
+    # and `SenderFault` reported by AWS and the original `Entry`.
+    failed: List[Dict[str, Any]] = field(default_factory=list)
+    # The number of attempts made to send each entry, keyed by the entry `Id`.
+    attempts: Dict[str, int] = field(default_factory=dict)
+
+
+def send_in_batches(
+        send_batch: Callable[[List[Entry]], Mapping[str, Any]],
+        entries: Sequence[Entry],
+        max_batch_size: int = 10,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        max_attempts: int = 3,
+        max_batch_bytes: int = MAX_BATCH_BYTES,
+        preserve_order: bool = True,
+        base_delay: float = 0.1,
+        max_delay: float = 5.0,
+        raise_too_large: bool = True) -> BatchResult:
+    """
+    Send entries in batches, with up to `max_workers` batches sent
+    concurrently.
+
+    `send_batch` is called with each batch and should return a response in
+    the format of the SQS `SendMessageBatch` and SNS `PublishBatch` APIs, ie
+    with `Successful` and `Failed` lists referencing the entries by `Id`.
+    Entry `Id`s must be unique.
+
+    Entries are packed into batches by both count and size with
+    `pack_batches`.  A `BatchEntryTooLargeException` is raised, before
+    anything is sent, if an entry is too large to be sent.  If
+    `raise_too_large` is False such entries are instead reported as failed,
+    with a `BatchEntryTooLargeException` code, and the others are sent.
+
+    Failed entries which are retryable are re-batched and sent again, after
+    a jittered exponential backoff, until `max_attempts` have been made.
+    Entries of a batch that raises an exception are treated as failed.
+
+    If an invocation deadline is set, see `deadline_utils`, batches and
+    retries aren't started once fewer than DEFAULT_MIN_REMAINING_TIME_MS
+    milliseconds remain, and their entries fail with a
+    `DeadlineExceededException` code.
+    """
+    entry_ids = [entry['Id'] for entry in entries]
+    if len(set(entry_ids)) != len(entry_ids):
+        raise ValueError('Entry Ids must be unique')
+
+    result = BatchResult()
+    pending = list(entries)
+    attempt = 0
+
+    if not raise_too_large:
+        pending = []
+        for entry in entries:
+            size = get_entry_size(entry)
+            if size > max_batch_bytes:
+                too_large = BatchEntryTooLargeException(
+                    f'Entry of {size} bytes is larger than {max_batch_bytes} bytes')
+                result.failed.append(
+                    {**exception_to_failure(entry['Id'], too_large), 'Entry': entry})
+            else:
+                pending.append(entry)
+
+    while pending:
+        attempt += 1
+        batches = pack_batches(pending, max_batch_size, max_batch_bytes, preserve_order)
+        responses = map_concurrently(
+            send_batch, batches, max_workers,
+            min_remaining_time_ms=DEFAULT_MIN_REMAINING_TIME_MS)
+        pending = []
+
+        for batch, response in zip(batches, responses):
+            batch_entries = {entry['Id']: entry for entry in batch}
+            for entry_id in batch_entries:
+                result.attempts[entry_id] = attempt
+
+            if isinstance(response, Exception):
+                failures = [
+                    exception_to_failure(entry_id, response) for entry_id in batch_entries]
+            else:
+                for success in response.get('Successful', []):
+                    result.message_ids[success['Id']] = success['MessageId']
+                failures = response.get('Failed', [])
+
+            for failure in failures:
+                entry = batch_entries[failure['Id']]
+                if attempt < max_attempts and is_retryable_failure(failure):
+                    pending.append(entry)
+                else:
+                    result.failed.append({**failure, 'Entry': entry})
+
+        if pending:
+            delay = get_backoff_delay(attempt, base_delay, max_delay)
+            if not has_time_remaining(DEFAULT_MIN_REMAINING_TIME_MS + int(delay * 1000)):
+                err = DeadlineExceededException('Retry not started before the deadline')
+                result.failed.extend(
+                    {**exception_to_failure(entry['Id'], err), 'Entry': entry}
+                    for entry in pending)
+                break
+            time.sleep(delay)
+
+    return result
+
+
+def pack_batches(
+        entries: Sequence[E],
+        max_batch_size: int = 10,
+        max_batch_bytes: int = MAX_BATCH_BYTES,
+        preserve_order: bool = True) -> List[List[E]]:
+    """
+    Pack entries into batches of at most `max_batch_size` entries and
+    `max_batch_bytes` total message size, as calculated by `get_entry_size`.
+
+    If `preserve_order` is True, entries are added to the current batch in
+    order, starting a new batch when it is full.  This is required for FIFO
+    queues.  Otherwise, entries are packed largest first into the first batch
+    with room for them, which results in fewer batches for mixed size entries.
+
+    Raises a `BatchEntryTooLargeException` if an entry is larger than
+    `max_batch_bytes`.
+    """
+    sized_entries = [(get_entry_size(entry), entry) for entry in entries]
+    too_large = [
+        (entry.get('Id'), size) for size, entry in sized_entries if size > max_batch_bytes]
+    if too_large:
+        raise BatchEntryTooLargeException(
+            f'Entries larger than {max_batch_bytes} bytes (Id, bytes): {too_large}')
+
+    batches: List[List[E]] = []
+    if preserve_order:
+        current_bytes = 0
+        for size, entry in sized_entries:
+            if (
+                    not batches
+                    or len(batches[-1]) >= max_batch_size
+                    or current_bytes + size > max_batch_bytes):
+                batches.append([])
+                current_bytes = 0
+            batches[-1].append(entry)
+            current_bytes += size
+        return batches
+
+    # First fit decreasing.  Batches are closed once they can't fit another
+    # entry, which keeps the search short for large numbers of entries.
+    sized_entries.sort(key=lambda sized_entry: sized_entry[0], reverse=True)
+    min_size = sized_entries[-1][0] if sized_entries else 0
+    batch_bytes: List[int] = []
+    # Indexes of the batches which may have room for more entries.
+    open_batches: List[int] = []
+    for size, entry in sized_entries:
+        for position, index in enumerate(open_batches):
+            if batch_bytes[index] + size <= max_batch_bytes:
+                break
+        else:
+            index = len(batches)
+            batches.append([])
+            batch_bytes.append(0)
+            position = len(open_batches)
+            open_batches.append(index)
+
+        batches[index].append(entry)
+        batch_bytes[index] += size
+        if (
+                len(batches[index]) >= max_batch_size
+                or batch_bytes[index] + min_size > max_batch_bytes):
+            del open_batches[position]
+    return batches
+
+
+def get_entry_size(entry: Entry) -> int:
+    """
+    Calculate the size in bytes of an SQS or SNS batch entry as counted
+    towards the batch size limit, ie the message body, subject and the name,
+    type and value of each message attribute.
+    """
+    size = 0
+    for key in ('MessageBody', 'Message', 'Subject'):
+        value = entry.get(key)
+        if value:
+            size += len(value.encode('utf-8'))
+
+    for key in ('MessageAttributes', 'MessageSystemAttributes'):
+        for name, attribute in entry.get(key, {}).items():
+            size += len(name.encode('utf-8'))
+            size += len(attribute.get('DataType', '').encode('utf-8'))
+            if 'StringValue' in attribute:
+                size += len(attribute['StringValue'].encode('utf-8'))
+            if 'BinaryValue' in attribute:
+                size += len(attribute['BinaryValue'])
+    return size
+
+
+def is_retryable_failure(failure: Dict[str, Any]) -> bool:
+    """
+    Failures are retryable if caused by AWS rather than the request, or if
+    the request was throttled.
+    """
+    return (
+        not failure.get('SenderFault', False)
+        or failure.get('Code') in RETRYABLE_ERROR_CODES)
+
+
+def exception_to_failure(entry_id: str, err: Exception) -> Dict[str, Any]:
+    """
+    Convert an exception raised when sending a batch to a failed entry in
+    the format returned by the AWS batch APIs.
+    """
+    error = getattr(err, 'response', {}).get('Error', {})
+    if error:
+        # A botocore ClientError.
+        code = error.get('Code', type(err).__name__)
+        sender_fault = error.get('Type') == 'Sender'
+    else:
+        from botocore.exceptions import ConnectionError, HTTPClientError
+
+        code = type(err).__name__
+        sender_fault = not isinstance(err, (ConnectionError, HTTPClientError))
+
+    return {
+        'Id': entry_id,
+        'SenderFault': sender_fault,
+        'Code': code,
+        'Message': str(err),
+    }
+
+
+def get_backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """
+    Exponential backoff with "full jitter", so clients retrying at the same
+    time spread their retries out.
+    """
+    return random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
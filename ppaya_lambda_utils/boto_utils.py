@@ -1,25 +1,50 @@
 from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+import io
 import json
+import logging
+import threading
+import time
 from typing import (
-    Any, List, Literal, Optional, Set, Dict, TYPE_CHECKING, Union)
-
-from aws_lambda_powertools.shared.json_encoder import Encoder
-import boto3
-from botocore.config import Config
-
+    Any, Iterable, List, Literal, Mapping, Optional, Sequence, Set, Dict, Tuple,
+    TYPE_CHECKING, Union)
+
+from ppaya_lambda_utils import json_utils
+from ppaya_lambda_utils.batch_utils import (
+    BatchResult, MAX_BATCH_BYTES, pack_batches, send_in_batches)
+from ppaya_lambda_utils.concurrency_utils import DEFAULT_MAX_WORKERS, map_concurrently
+from ppaya_lambda_utils.deadline_utils import (
+    check_deadline, DEFAULT_MIN_REMAINING_TIME_MS, get_max_timeout, has_time_remaining)
 from ppaya_lambda_utils.exceptions import (
-    InvokeLambdaFunctionException, WorkflowException)
-from ppaya_lambda_utils.logging_utils import get_logger_factory
+    DeadlineExceededException, InvokeLambdaFunctionException, WorkflowException)
+from ppaya_lambda_utils.instrumentation_utils import instrument_client
+from ppaya_lambda_utils.logging_utils import LazyLogger, log_payload
 
+# boto3 and botocore are imported where they are used
+# as they are slow to import, adding to the cold start of every lambda function
+# importing this module.
 if TYPE_CHECKING:
+    from aws_lambda_powertools.utilities.typing import LambdaContext
+    import boto3
+    from botocore.config import Config
     from mypy_boto3_sns import SNSClient
+    from mypy_boto3_sns.type_defs import PublishBatchRequestEntryTypeDef
     from mypy_boto3_sqs import SQSServiceResource
     from mypy_boto3_sqs.type_defs import SendMessageBatchRequestEntryTypeDef
     from mypy_boto3_lambda.client import LambdaClient
     from mypy_boto3_lambda.type_defs import InvocationResponseTypeDef
 
 
-logger = get_logger_factory(__name__)()
+logger = LazyLogger(__name__)
+
+# (service name, region name, endpoint url, config fingerprint)
+CacheKey = Tuple[str, Optional[str], Optional[str], str]
+
+# botocore's default connect and read timeouts, in seconds.
+DEFAULT_TIMEOUT: int = 60
+
+# Formats in which lambda function response payloads can be returned.
+ResponseFormat = Literal['json', 'bytes', 'stream', 'items']
 
 
 class BotoClients(object):
@@ -28,6 +53,12 @@ class BotoClients(object):
     them internally, allowing them to be re-used across lambda invocations.
     This should limit connection latency to the initial, cold start invocation.
 
+    Clients and resources are cached by service name, region, endpoint url
+    and configuration, so asking for a service with a different `Config`
+    returns a separate object rather than the one created first.  The cache
+    is safe to fill from multiple threads and each object is only created
+    once.
+
     Most of the time you will want to import the instantiated object from
     this module::
 
@@ -40,12 +71,44 @@ class BotoClients(object):
 
         def lambda_handler(event, context):
             s3 = boto_clients.get_client('s3')
+
+    When sharing a client between worker threads, size the connection pool
+    to match the number of workers::
+
+        sqs = boto_clients.get_client('sqs', max_pool_connections=50)
+
+    The connect and read timeouts of a client can be capped with
+    `max_timeout`, eg to the time remaining in the invocation as returned by
+    `deadline_utils.get_max_timeout`.
+
+    Clients and resources can be created concurrently during the lambda init
+    phase, moving their creation cost out of the first invocation::
+
+        boto_clients.prewarm(['dynamodb', 'sns'], resources=['sqs'])
+
+    The latency, retries, throttling and sizes of the AWS calls made by the
+    created clients are recorded in `instrumentation_utils.aws_call_stats`,
+    unless `instrument` is set to False before they are created.
     """
     # Internal cache to store boto resource objects and share between all
     # instances of the BotoResource class and across lambda invocations.
-    _resources: Dict[str, Any] = {}
-    _clients: Dict[str, Any] = {}
+    _resources: Dict[CacheKey, Any] = {}
+    _clients: Dict[CacheKey, Any] = {}
     _default_config: Optional[Config] = None
+    # Guards `_creation_locks`, which hold one lock per cache key so that
+    # different services can be created concurrently.
+    _lock: threading.Lock = threading.Lock()
+    _creation_locks: Dict[Tuple[str, CacheKey], threading.Lock] = {}
+    # The merged config and its fingerprint, keyed by the id of the base
+    # config and the overrides, so a cache hit doesn't merge or fingerprint
+    # configs.  The base config is held to check the id hasn't been re-used.
+    _configs: Dict[
+        Tuple[int, Optional[int], Optional[float]],
+        Tuple[Optional[Config], Optional[Config], str]] = {}
+    # boto3 sessions are not thread safe, so each thread creates its own.
+    _local: threading.local = threading.local()
+    # Record AWS call statistics of the created clients.
+    instrument: bool = True
 
     def __init__(self, config: Optional[Config] = None) -> None:
         if config:
@@ -54,19 +117,190 @@ class BotoClients(object):
     def set_default_config(self, config: Config) -> None:
         self._default_config = config
 
-    def get_client(self, name: str, config: Optional[Config] = None) -> Any:
-        config = config or self._default_config
-        if name not in self._clients:
-            logger.debug({'msg': 'Creating boto client', 'service': name})
-            self._clients[name] = boto3.client(name, config=config)  # type: ignore
-        return self._clients[name]
+    def get_client(
+            self,
+            name: str,
+            config: Optional[Config] = None,
+            region_name: Optional[str] = None,
+            endpoint_url: Optional[str] = None,
+            max_pool_connections: Optional[int] = None,
+            max_timeout: Optional[float] = None) -> Any:
+        config, fingerprint = self._get_config(config, max_pool_connections, max_timeout)
+        return self._get_or_create(
+            'client', self._clients, name, config, fingerprint, region_name, endpoint_url)
+
+    def get_resource(
+            self,
+            name: str,
+            config: Optional[Config] = None,
+            region_name: Optional[str] = None,
+            endpoint_url: Optional[str] = None,
+            max_pool_connections: Optional[int] = None,
+            max_timeout: Optional[float] = None) -> Any:
+        config, fingerprint = self._get_config(config, max_pool_connections, max_timeout)
+        return self._get_or_create(
+            'resource', self._resources, name, config, fingerprint, region_name,
+            endpoint_url)
+
+    def prewarm(
+            self,
+            clients: Iterable[str] = (),
+            resources: Iterable[str] = (),
+            config: Optional[Config] = None,
+            connect: bool = False,
+            max_workers: int = 4) -> Dict[str, float]:
+        """
+        Create the named clients and resources concurrently, typically at
+        module level in a handler module so the cost is paid during the lambda
+        init phase.  Subsequent calls to `get_client` / `get_resource` with the
+        same arguments return the prewarmed objects.
+
+        If `connect` is True, a first connection is opened to each service
+        endpoint so the TLS handshake is also complete before the first
+        invocation.
+
+        Returns the number of milliseconds taken for each service, keyed by
+        eg "client:sns" or "resource:sqs".  Failures are logged and otherwise
+        ignored, the object will be created on first use instead.
+        """
+        services: List[Tuple[Literal['client', 'resource'], str]] = [
+            *[('client', name) for name in clients],
+            *[('resource', name) for name in resources],
+        ]
+        durations: Dict[str, float] = {}
+        if not services:
+            return durations
+
+        def prewarm_service(kind: Literal['client', 'resource'], name: str) -> None:
+            started_at = time.perf_counter()
+            try:
+                if kind == 'client':
+                    client = self.get_client(name, config=config)
+                else:
+                    client = self.get_resource(name, config=config).meta.client
+                if connect:
+                    open_connection(client)
+            except Exception as err:
+                logger.warning({
+                    'msg': 'Failed to prewarm boto service',
+                    'service': f'{kind}:{name}',
+                    'error': str(err),
+                })
+                return
+            durations[f'{kind}:{name}'] = (time.perf_counter() - started_at) * 1000
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(services))) as executor:
+            for kind, name in services:
+                executor.submit(prewarm_service, kind, name)
+
+        logger.debug({'msg': 'Prewarmed boto services', 'durations_ms': durations})
+        return durations
+
+    def _get_config(
+            self,
+            config: Optional[Config],
+            max_pool_connections: Optional[int],
+            max_timeout: Optional[float] = None) -> Tuple[Optional[Config], str]:
+        """
+        Return the config with the overrides applied and its fingerprint.
+        """
+        base_config = config or self._default_config
+        memo_key = (id(base_config), max_pool_connections, max_timeout)
+        memo = self._configs.get(memo_key)
+        if memo is not None and memo[0] is base_config:
+            return memo[1], memo[2]
+
+        config = base_config
+        if max_pool_connections:
+            from botocore.config import Config
+            pool_config = Config(max_pool_connections=max_pool_connections)
+            config = config.merge(pool_config) if config else pool_config
+        if max_timeout:
+            from botocore.config import Config
+            read_timeout = getattr(config, 'read_timeout', None) or DEFAULT_TIMEOUT
+            connect_timeout = getattr(config, 'connect_timeout', None) or DEFAULT_TIMEOUT
+            if max(read_timeout, connect_timeout) > max_timeout:
+                timeout_config = Config(
+                    read_timeout=min(read_timeout, max_timeout),
+                    connect_timeout=min(connect_timeout, max_timeout))
+                config = config.merge(timeout_config) if config else timeout_config
+
+        fingerprint = config_fingerprint(config)
+        if len(self._configs) >= 256:
+            # Only expected if new configs are created for each call.
+            self._configs.clear()
+        self._configs[memo_key] = (base_config, config, fingerprint)
+        return config, fingerprint
+
+    def _get_or_create(
+            self,
+            kind: Literal['client', 'resource'],
+            cache: Dict[CacheKey, Any],
+            name: str,
+            config: Optional[Config],
+            fingerprint: str,
+            region_name: Optional[str],
+            endpoint_url: Optional[str]) -> Any:
+        key = (name, region_name, endpoint_url, fingerprint)
+        try:
+            return cache[key]
+        except KeyError:
+            pass
+
+        with self._lock:
+            creation_lock = self._creation_locks.setdefault(
+                (kind, key), threading.Lock())
+
+        with creation_lock:
+            if key not in cache:
+                logger.debug({
+                    'msg': f'Creating boto {kind}',
+                    'service': name,
+                    'region': region_name,
+                    'endpoint_url': endpoint_url,
+                })
+                session = self._get_session()
+                create = session.client if kind == 'client' else session.resource
+                service = create(  # type: ignore
+                    name, region_name=region_name, endpoint_url=endpoint_url,
+                    config=config)
+                if self.instrument:
+                    instrument_client(service if kind == 'client' else service.meta.client)
+                cache[key] = service
+        return cache[key]
+
+    def _get_session(self) -> boto3.session.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            import boto3.session
+            session = boto3.session.Session()
+            self._local.session = session
+        return session
+
+
+def open_connection(client: Any) -> None:
+    """
+    Open a connection to the endpoint of a boto client, completing the TLS
+    handshake.  The connection is returned to the client's connection pool
+    for re-use by the first real request.
+    """
+    from botocore.awsrequest import AWSRequest
+    request = AWSRequest(method='HEAD', url=client.meta.endpoint_url).prepare()
+    response = client._endpoint.http_session.send(request)
+    # Reading the (empty) content releases the connection back to the pool.
+    response.content
 
-    def get_resource(self, name: str, config: Optional[Config] = None) -> Any:
-        config = config or self._default_config
-        if name not in self._resources:
-            logger.debug({'msg': 'Creating boto resource', 'service': name})
-            self._resources[name] = boto3.resource(name, config=config)  # type: ignore
-        return self._resources[name]
+
+def config_fingerprint(config: Optional[Config]) -> str:
+    """
+    Returns a string uniquely identifying the options of a botocore `Config`
+    for use as a cache key.  Configs with equal options have equal
+    fingerprints, even if they are different objects.
+    """
+    if config is None:
+        return ''
+    options = {name: getattr(config, name, None) for name in config.OPTION_DEFAULTS}
+    return json.dumps(options, sort_keys=True, default=repr)
 
 
 boto_clients: BotoClients = BotoClients()
@@ -79,35 +313,120 @@ def publish_to_sns(
     Publish a dictionary message to SNS as a JSON structure with optional
     message attribures which can be used for filtering by consumers.
     """
-    logger.info(
-        {'msg': 'Publishing to SNS', 'topic': topic_arn, 'body': message})
+    log_payload(logger, logging.INFO, 'Publishing to SNS', topic=topic_arn, body=message)
     message_attributes = message_attributes or {}
     client.publish(
         TopicArn=topic_arn,
-        Message=json.dumps({'default': json.dumps(message, cls=Encoder)}),
+        Message=to_sns_json_message(message),
         MessageStructure='json',
         MessageAttributes=message_attributes
     )
 
 
+def publish_batch_to_sns(
+        client: SNSClient,
+        topic_arn: str,
+        messages: Sequence[Dict[str, Any]],
+        message_attributes: Optional[Dict[str, Any]] = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        max_attempts: int = 3,
+        raise_too_large: bool = True) -> BatchResult:
+    """
+    Publish dictionary messages to SNS, in the same format as `publish_to_sns`,
+    using the SNS `PublishBatch` API.  Up to 10 messages are published per
+    request, packed by size, with up to `max_workers` requests made
+    concurrently.  Failed messages which are retryable are retried with a
+    jittered backoff, up to `max_attempts` times.
+
+    The optional `message_attributes` are added to every message.
+
+    A `BatchEntryTooLargeException` is raised, before anything is published,
+    if a message is too large, unless `raise_too_large` is False in which
+    case it is reported as failed, see `send_in_batches`.
+
+    Returns a `BatchResult` where entries are identified by the index of the
+    message in `messages`::
+
+        result = publish_batch_to_sns(sns, topic_arn, messages)
+        failed_messages = [messages[int(x['Id'])] for x in result.failed]
+    """
+    logger.info({
+        'msg': 'Publishing batch to SNS', 'topic': topic_arn, 'count': len(messages)})
+    message_attributes = message_attributes or {}
+    entries: List[PublishBatchRequestEntryTypeDef] = [
+        {
+            'Id': str(index),
+            'Message': to_sns_json_message(message),
+            'MessageStructure': 'json',
+            'MessageAttributes': message_attributes,
+        }
+        for index, message in enumerate(messages)
+    ]
+
+    def send_batch(batch: List[Any]) -> Mapping[str, Any]:
+        return client.publish_batch(TopicArn=topic_arn, PublishBatchRequestEntries=batch)
+
+    result = send_in_batches(
+        send_batch, entries, max_workers=max_workers, max_attempts=max_attempts,
+        preserve_order=False, raise_too_large=raise_too_large)
+
+    if result.failed:
+        logger.error({
+            'msg': f'Failed to publish {len(result.failed)} messages to {topic_arn}',
+            'failed': [
+                {k: v for k, v in failure.items() if k != 'Entry'}
+                for failure in result.failed],
+        })
+    return result
+
+
+def to_sns_json_message(message: Dict[str, Any]) -> str:
+    """
+    Serialize a dictionary message for publishing to SNS with a `json`
+    message structure.
+
+    The message is serialized once and the resulting string embedded in the
+    `default` envelope, which only requires escaping the string rather than
+    serializing the message a second time.
+    """
+    return json_utils.dumps({'default': json_utils.dumps(message)})
+
+
 def send_to_sqs(
         resource: SQSServiceResource,
         queue_url: str,
         entries: List[SendMessageBatchRequestEntryTypeDef],
-        max_batch_size: int = 10) -> Set[str]:
+        max_batch_size: int = 10,
+        max_batch_bytes: int = MAX_BATCH_BYTES,
+        min_remaining_time_ms: int = DEFAULT_MIN_REMAINING_TIME_MS) -> Set[str]:
     """
     Send a list of dictionaries to an SQS queue.  A maximum of 10 messages
     can be sent in a single call to `send_messages` so if there are more than
-    `max_batch_size` entries they will be sent in batches.
+    `max_batch_size` entries they will be sent in batches.  Batches are also
+    limited to a total message size of `max_batch_bytes`, the SQS limit.
+
+    A `BatchEntryTooLargeException` is raised, before anything is sent, if
+    an entry is too large to be sent.
+
+    If an invocation deadline is set, see `deadline_utils`, no more batches
+    are sent once fewer than `min_remaining_time_ms` milliseconds remain.  A
+    `DeadlineExceededException` is raised with the unsent entries as its
+    `resume_token` and the ids of the sent messages as its `partial_result`.
+
+    Failed entries are logged, use `send_to_sqs_concurrently` to retry them.
     """
     queue = resource.Queue(queue_url)
-    message_ids = set()
+    message_ids: Set[str] = set()
 
-    batches = [
-        entries[x: x + max_batch_size]
-        for x in range(0, len(entries), max_batch_size)]
+    batches = pack_batches(entries, max_batch_size, max_batch_bytes)
+
+    for index, batch in enumerate(batches):
+        if not has_time_remaining(min_remaining_time_ms):
+            unsent = [entry for unsent_batch in batches[index:] for entry in unsent_batch]
+            raise DeadlineExceededException(
+                f'Sending to {queue_url} stopped with {len(unsent)} entries unsent',
+                resume_token=unsent, partial_result=message_ids)
 
-    for batch in batches:
         result = queue.send_messages(Entries=batch)
 
         successful = result.get('Successful', [])
@@ -129,39 +448,181 @@ def send_to_sqs(
     return message_ids
 
 
+def send_to_sqs_concurrently(
+        resource: SQSServiceResource,
+        queue_url: str,
+        entries: List[SendMessageBatchRequestEntryTypeDef],
+        max_batch_size: int = 10,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        max_attempts: int = 3,
+        max_batch_bytes: int = MAX_BATCH_BYTES,
+        preserve_order: bool = False) -> BatchResult:
+    """
+    Send a list of dictionaries to an SQS queue in batches, sending up to
+    `max_workers` batches concurrently.  Failed entries which are retryable
+    (ie not caused by the entry itself) are retried with a jittered backoff,
+    up to `max_attempts` times.  Entry `Id`s must be unique.
+
+    Entries are packed into as few batches as possible by count and size,
+    see `pack_batches`.  A `BatchEntryTooLargeException` is raised, before
+    anything is sent, if an entry is too large to be sent.
+
+    Returns a `BatchResult` with the message ids of the successful entries,
+    the entries that failed permanently and the number of attempts made to
+    send each entry.
+
+    As batches are sent concurrently, messages may be delivered out of order,
+    so this isn't suitable for FIFO queues where order is important.
+
+    The underlying, thread safe client of `resource` is used to send the
+    batches.  Its connection pool should be sized for `max_workers`::
+
+        sqs = boto_clients.get_resource('sqs', max_pool_connections=20)
+        result = send_to_sqs_concurrently(sqs, queue_url, entries, max_workers=20)
+        if result.failed:
+            # handle failed entries
+    """
+    client = resource.meta.client
+
+    def send_batch(batch: List[Any]) -> Mapping[str, Any]:
+        return client.send_message_batch(QueueUrl=queue_url, Entries=batch)
+
+    result = send_in_batches(
+        send_batch, entries, max_batch_size, max_workers, max_attempts,
+        max_batch_bytes, preserve_order)
+
+    if result.failed:
+        logger.error({
+            'msg': f'Failed to publish {len(result.failed)} messages to {queue_url}',
+            'failed': [
+                {k: v for k, v in failure.items() if k != 'Entry'}
+                for failure in result.failed],
+        })
+    return result
+
+
 def invoke_lambda_function(
     function_name: str,
     payload: Dict[str, Any],
-    invocation_type: Union[Literal['Event'], Literal['RequestResponse']] = 'Event'
+    invocation_type: Union[Literal['Event'], Literal['RequestResponse']] = 'Event',
+    response_format: ResponseFormat = 'json'
+) -> Any:
+    """
+    Invoke a lambda function, raising an `InvokeLambdaFunctionException` if
+    the invocation fails.
+
+    For `RequestResponse` invocations, the response payload is returned in
+    the given `response_format`:
+
+    - "json": the decoded JSON payload.
+    - "bytes": the raw payload bytes, without decoding.
+    - "stream": the payload stream, which should be read or closed by the
+      caller.
+    - "items": an iterator decoding the items of a JSON array payload
+      incrementally from the stream, so large responses are never held in
+      memory in full.
+
+    Usage::
+
+        for item in invoke_lambda_function(
+                'worker-function', payload, 'RequestResponse', 'items'):
+            # process item
+
+    If an invocation deadline is set, see `deadline_utils`, the client
+    timeouts are capped to the time remaining and a
+    `DeadlineExceededException` is raised if too little time remains to start.
+    """
+    check_deadline(f'Invoke {function_name}')
+    client: LambdaClient = boto_clients.get_client('lambda', max_timeout=get_max_timeout())
+    return _invoke_lambda_function(
+        client, function_name, payload, invocation_type, response_format)
+
+
+def invoke_lambda_functions(
+    invocations: Sequence[Tuple[str, Dict[str, Any]]],
+    invocation_type: Union[Literal['Event'], Literal['RequestResponse']] = 'RequestResponse',
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    context: Optional[LambdaContext] = None,
+    min_remaining_time_ms: int = 1000,
+    response_format: ResponseFormat = 'json',
+) -> List[Any]:
+    """
+    Invoke many lambda functions concurrently, with up to `max_workers`
+    invocations in flight at once.  `invocations` is a list of
+    (function name, payload) pairs.
+
+    Returns the results, as returned by `invoke_lambda_function`, in the same
+    order as `invocations`.  If an invocation fails, the exception is returned
+    in place of its result rather than raised.
+
+    If the lambda `context` of the calling function is given, invocations are
+    no longer started once there are fewer than `min_remaining_time_ms`
+    milliseconds remaining and a `DeadlineExceededException` is returned in
+    place of their results.  Without a `context`, the invocation deadline set by
+    `observability_init_middleware` is used, if any.
+
+    Usage::
+
+        results = invoke_lambda_functions(
+            [('worker-function', {'page': x}) for x in range(50)],
+            max_workers=20, context=context)
+        for result in results:
+            if isinstance(result, Exception):
+                # handle failure
+    """
+    client: LambdaClient = boto_clients.get_client(
+        'lambda', max_pool_connections=max(max_workers, 10), max_timeout=get_max_timeout())
+
+    def invoke(invocation: Tuple[str, Dict[str, Any]]) -> Any:
+        function_name, payload = invocation
+        return _invoke_lambda_function(
+            client, function_name, payload, invocation_type, response_format)
+
+    return map_concurrently(
+        invoke, invocations, max_workers,
+        context.get_remaining_time_in_millis if context else None,
+        min_remaining_time_ms)
+
+
+def _invoke_lambda_function(
+    client: LambdaClient,
+    function_name: str,
+    payload: Dict[str, Any],
+    invocation_type: Union[Literal['Event'], Literal['RequestResponse']],
+    response_format: ResponseFormat
 ) -> Any:
-    client: LambdaClient = boto_clients.get_client('lambda')
     resp: InvocationResponseTypeDef = client.invoke(
         FunctionName=function_name,
         InvocationType=invocation_type,
-        Payload=bytes(json.dumps(payload, cls=Encoder), encoding='utf-8')
+        Payload=json_utils.dumps_bytes(payload)
     )
 
     success_codes: Dict[Union[Literal['Event'], Literal['RequestResponse']], int] = {
         'Event': 202, 'RequestResponse': 200}
+    failed = (
+        resp['StatusCode'] != success_codes[invocation_type] or resp.get('FunctionError'))
 
-    resp_payload_stream = resp.get('Payload')
-    if resp_payload_stream:
+    resp_payload_stream: Any = resp.get('Payload') or io.BytesIO(b'')
+    if failed or invocation_type == 'Event' or response_format in ('json', 'bytes'):
         resp_payload = resp_payload_stream.read()
-    else:
-        resp_payload = b''
 
-    if resp['StatusCode'] != success_codes[invocation_type] or resp.get('FunctionError'):
-        logger.error({
-            'msg': 'Invoke lambda function failed',
-            'function_name': function_name,
-            'response': resp,
-            'response_payload': resp_payload,
-            'payload': payload,
-        })
+    if failed:
+        log_payload(
+            logger, logging.ERROR, 'Invoke lambda function failed',
+            function_name=function_name,
+            response={k: v for k, v in resp.items() if k != 'Payload'},
+            response_payload=resp_payload,
+            payload=payload)
         raise InvokeLambdaFunctionException(f'Invoke function failed: {function_name}')
 
     if invocation_type == 'RequestResponse':
-        return json.loads(resp_payload)
+        if response_format == 'bytes':
+            return resp_payload
+        elif response_format == 'stream':
+            return resp_payload_stream
+        elif response_format == 'items':
+            return json_utils.iter_json_array(resp_payload_stream)
+        return json_utils.loads(resp_payload)
 
 
 def start_sync_workflow(
@@ -172,18 +633,82 @@ def start_sync_workflow(
     Synchronously execute a step function express workflow.
     If successful, the function returns the `output` dictionary from the response.
     If unsuccessful, a WorkflowException error is raised.
+
+    If an invocation deadline is set, see `deadline_utils`, the client
+    timeouts are capped to the time remaining and a
+    `DeadlineExceededException` is raised if too little time remains to start.
+    """
+    check_deadline(f'Workflow {state_machine_arn}')
+    client = boto_clients.get_client('stepfunctions', max_timeout=get_max_timeout())
+    return _start_sync_workflow(client, input, state_machine_arn)
+
+
+def start_sync_workflows(
+    inputs: Sequence[Dict[str, Any]],
+    state_machine_arn: str,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    context: Optional[LambdaContext] = None,
+    min_remaining_time_ms: int = 1000,
+) -> List[Union[Dict[str, Any], Exception]]:
     """
-    client = boto_clients.get_client('stepfunctions')
+    Synchronously execute a step function express workflow for each of
+    `inputs`, with up to `max_workers` executions running concurrently.
+
+    Returns the `output` dictionary of each execution in the same order as
+    `inputs`.  If an execution fails, the exception (usually a
+    WorkflowException) is returned in place of its output rather than raised,
+    so the other executions are unaffected.
+
+    If the lambda `context` of the calling function is given, executions are
+    no longer started once there are fewer than `min_remaining_time_ms`
+    milliseconds remaining and a `DeadlineExceededException` is returned in
+    place of their output.  Without a `context`, the invocation deadline set by
+    `observability_init_middleware` is used, if any.
+
+    Usage::
+
+        results = start_sync_workflows(inputs, state_machine_arn, context=context)
+        for input, result in zip(inputs, results):
+            if isinstance(result, Exception):
+                # handle failure
+    """
+    client = boto_clients.get_client(
+        'stepfunctions', max_pool_connections=max(max_workers, 10),
+        max_timeout=get_max_timeout())
+
+    def start(input: Dict[str, Any]) -> Dict[str, Any]:
+        return _start_sync_workflow(client, input, state_machine_arn)
+
+    results = map_concurrently(
+        start, inputs, max_workers,
+        context.get_remaining_time_in_millis if context else None,
+        min_remaining_time_ms)
+
+    failed = [result for result in results if isinstance(result, Exception)]
+    if failed:
+        logger.warning({
+            'msg': f'{len(failed)} of {len(inputs)} workflows failed',
+            'state_machine_arn': state_machine_arn,
+            'errors': sorted(set(str(err) for err in failed)),
+        })
+    return results
+
+
+def _start_sync_workflow(
+    client: Any,
+    input: Dict[str, Any],
+    state_machine_arn: str
+) -> Dict[str, Any]:
     resp = client.start_sync_execution(
         stateMachineArn=state_machine_arn,
-        input=json.dumps(input),
+        input=json_utils.dumps(input),
     )
     assert isinstance(resp, Dict)
     status = resp.get('status')
     if status == 'SUCCEEDED':
-        result = json.loads(resp['output'])
+        result = json_utils.loads(resp['output'])
     elif status == 'FAILED':
-        error_data = json.loads(resp.get('cause', '{}'))
+        error_data = json_utils.loads(resp.get('cause', '{}'))
         raise WorkflowException(
             error_data.get('errorMessage', 'Workflow failed'),
             error_data.get('errorType', 'Unknown')
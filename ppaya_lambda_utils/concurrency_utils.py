@@ -0,0 +1,62 @@
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, TypeVar, Union
+
+from ppaya_lambda_utils import deadline_utils
+from ppaya_lambda_utils.exceptions import DeadlineExceededException
+
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+# Default number of threads used when making concurrent calls to AWS.
+DEFAULT_MAX_WORKERS: int = 10
+
+
+def map_concurrently(
+        func: Callable[[T], R],
+        items: Sequence[T],
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        get_remaining_time_ms: Optional[Callable[[], Optional[int]]] = None,
+        min_remaining_time_ms: int = 0) -> List[Union[R, Exception]]:
+    """
+    Call `func` for each item on a thread pool of at most `max_workers`
+    threads, returning the results in the same order as `items`.
+
+    Exceptions raised by `func` are returned in place of the result for that
+    item rather than raised, so one failure doesn't lose the other results.
+
+    If `get_remaining_time_ms` is given, eg the `get_remaining_time_in_millis`
+    method of a lambda context, items are no longer started once there are
+    fewer than `min_remaining_time_ms` milliseconds remaining.  A
+    `DeadlineExceededException` is returned in place of their results.
+    Otherwise the invocation deadline set by `observability_init_middleware`
+    is used, if any, see `deadline_utils`.
+
+    Usage::
+
+        results = map_concurrently(fetch_item, item_ids, max_workers=5)
+        for item_id, result in zip(item_ids, results):
+            if isinstance(result, Exception):
+                # handle failure
+    """
+    get_remaining_time_ms = get_remaining_time_ms or deadline_utils.get_remaining_time_ms
+
+    def call(item: T) -> Union[R, Exception]:
+        if get_remaining_time_ms is not None:
+            remaining_time_ms = get_remaining_time_ms()
+            if remaining_time_ms is not None and remaining_time_ms < min_remaining_time_ms:
+                return DeadlineExceededException(
+                    f'Not started with {remaining_time_ms}ms remaining')
+        try:
+            return func(item)
+        except Exception as err:
+            return err
+
+    if not items:
+        return []
+    if len(items) == 1 or max_workers <= 1:
+        return [call(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(call, items))
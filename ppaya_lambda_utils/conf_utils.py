@@ -1,20 +1,278 @@
+from __future__ import annotations
 from datetime import datetime
+from enum import Enum
+from functools import partial
 import os
-from typing import List, Optional
+import random
+import sys
+import threading
+from typing import (
+    Any, Callable, Dict, get_args, get_origin, List, Optional, Tuple, Type,
+    TYPE_CHECKING, Union)
 
-from aws_lambda_powertools.utilities import parameters
-from botocore.config import Config
+from ppaya_lambda_utils.exceptions import SettingsException
+from ppaya_lambda_utils.logging_utils import LazyLogger
 
 
-BOTO_CONFIG = Config(
-    retries={
-        'max_attempts': 10,
-        'mode': 'standard',
-    }
-)
+if TYPE_CHECKING:
+    from botocore.config import Config
 
+    BOTO_CONFIG: Config
 
-class BaseSettings(object):
+
+def __getattr__(name: str) -> Any:
+    # BOTO_CONFIG is created on first access, avoiding the cost of importing
+    # botocore when this module is imported.
+    if name == 'BOTO_CONFIG':
+        return get_boto_config()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def get_boto_config() -> Config:
+    """
+    The botocore Config used to fetch settings, with more retries than the
+    default as settings are required to handle an invocation.
+    """
+    global BOTO_CONFIG
+    if 'BOTO_CONFIG' not in globals():
+        from botocore.config import Config
+
+        BOTO_CONFIG = Config(
+            retries={
+                'max_attempts': 10,
+                'mode': 'standard',
+            }
+        )
+    return BOTO_CONFIG
+
+
+logger = LazyLogger(__name__)
+
+
+# String values parsed as booleans, compared case-insensitively.
+TRUE_VALUES = frozenset(['1', 'true', 'yes', 'on'])
+FALSE_VALUES = frozenset(['0', 'false', 'no', 'off'])
+
+
+class SettingsField(object):
+    """
+    A descriptor for the environ and secret fields of `BaseSettings`
+    sub-classes, storing the value in a slot of the settings object, or its
+    `__dict__` if the class doesn't declare `__slots__`.
+
+    Reading a secret field loads the secrets if they haven't been loaded or
+    have expired.  Accessed on the class, the default value is returned.
+    """
+    def __init__(
+            self, name: str, default: Any, parser: Callable[[Any], Any],
+            secret: bool, slot: Any) -> None:
+        self.name = name
+        self.default = default
+        self.parser = parser
+        self.secret = secret
+        # The member descriptor of the slot holding the value, or None if the
+        # value is held in the instance `__dict__`.
+        self.slot = slot
+
+    def __get__(self, instance: Optional[BaseSettings], owner: Any = None) -> Any:
+        if instance is None:
+            return self.default
+        if self.secret and instance.SECRETS_LOAD_ON_ACCESS:
+            instance.load_secret_settings()
+        try:
+            if self.slot is None:
+                return instance.__dict__[self.name]
+            return self.slot.__get__(instance, owner)
+        except (AttributeError, KeyError):
+            return self.default
+
+    def __set__(self, instance: BaseSettings, value: Any) -> None:
+        if self.slot is None:
+            instance.__dict__[self.name] = value
+        else:
+            self.slot.__set__(instance, value)
+
+    def __delete__(self, instance: BaseSettings) -> None:
+        if self.slot is None:
+            instance.__dict__.pop(self.name, None)
+        else:
+            self.slot.__delete__(instance)
+
+    def parse(self, value: Any) -> Any:
+        try:
+            return self.parser(value)
+        except (TypeError, ValueError, KeyError) as err:
+            raise SettingsException(f'Invalid value for setting {self.name}: {err}') from err
+
+
+class SettingsMeta(type):
+    """
+    Compiles the environ and secret fields of `BaseSettings` sub-classes into
+    `SettingsField` descriptors, with a parser for the type annotation of
+    each field, when the class is defined.  If the class declares
+    `__slots__`, new fields are added to them.
+    """
+    def __new__(
+            mcs, name: str, bases: Tuple[type, ...], namespace: Dict[str, Any],
+            **kwargs: Any) -> Any:
+        environ_fields = _get_class_attr(namespace, bases, 'environ_fields', [])
+        secret_fields = _get_class_attr(namespace, bases, 'secret_fields', [])
+        field_names = list(dict.fromkeys([*environ_fields, *secret_fields]))
+
+        inherited = {
+            field_name: _get_class_attr({}, bases, field_name, None)
+            for field_name in field_names}
+        defaults = {
+            field_name: namespace.pop(field_name)
+            for field_name in field_names if field_name in namespace}
+        use_slots = '__slots__' in namespace
+        if use_slots:
+            slots = namespace['__slots__']
+            namespace['__slots__'] = (
+                *([slots] if isinstance(slots, str) else slots),
+                *[field_name for field_name in field_names
+                  if not isinstance(inherited[field_name], SettingsField)])
+
+        cls: Any = super().__new__(mcs, name, bases, namespace, **kwargs)
+
+        for field_name in field_names:
+            parent = inherited[field_name]
+            if isinstance(parent, SettingsField):
+                slot = parent.slot
+                default = defaults.get(field_name, parent.default)
+            else:
+                slot = cls.__dict__[field_name] if use_slots else None
+                default = defaults.get(field_name, parent)
+            hint = _get_type_hint(cls, field_name)
+            if hint is None and default is not None:
+                hint = type(default)
+            setattr(cls, field_name, SettingsField(
+                field_name, default, get_field_parser(hint),
+                secret=field_name in secret_fields, slot=slot))
+
+        cls._environ_field_table = tuple(cls.__dict__[name] for name in environ_fields)
+        cls._secret_field_table = tuple(cls.__dict__[name] for name in secret_fields)
+        return cls
+
+
+def get_field_parser(hint: Any) -> Callable[[Any], Any]:
+    """
+    Return a function parsing a string (eg from an environment variable) or
+    a decoded JSON value to the type `hint`.  bool, int, float, Decimal, str,
+    List[...], Dict (parsed as JSON), Enum and Optional types are supported,
+    other values are returned as they are.
+    """
+    origin = get_origin(hint)
+    args = get_args(hint)
+    if hint is Any or (origin is None and getattr(hint, '__module__', None) == 'typing'):
+        # Any and other special forms, which are classes in Python 3.11+.
+        return parse_any
+    if origin is Union:
+        types = [arg for arg in args if arg is not type(None)]  # noqa: E721
+        if len(types) == 1:
+            return partial(parse_optional, get_field_parser(types[0]))
+        return parse_any
+    if hint is bool:
+        return parse_bool
+    if hint is list or origin is list:
+        return partial(parse_list, get_field_parser(args[0]) if args else parse_any)
+    if hint is dict or origin is dict:
+        return parse_json
+    if isinstance(hint, type) and issubclass(hint, Enum):
+        return partial(parse_enum, hint)
+    if isinstance(hint, type) and hint is not type(None):  # noqa: E721
+        return partial(parse_value, hint)
+    return parse_any
+
+
+def parse_any(value: Any) -> Any:
+    return value
+
+
+def parse_optional(parser: Callable[[Any], Any], value: Any) -> Any:
+    return None if value is None else parser(value)
+
+
+def parse_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        if value.lower() in TRUE_VALUES:
+            return True
+        if value.lower() in FALSE_VALUES:
+            return False
+        raise ValueError(f'{value!r} is not a boolean')
+    return bool(value)
+
+
+def parse_list(parser: Callable[[Any], Any], value: Any) -> List[Any]:
+    """
+    Lists are parsed from a JSON array or a comma separated string.
+    """
+    if isinstance(value, str):
+        if value.lstrip().startswith('['):
+            from ppaya_lambda_utils import json_utils
+            value = json_utils.loads(value)
+        else:
+            value = [item.strip() for item in value.split(',') if item.strip()]
+    return [parser(item) for item in value]
+
+
+def parse_json(value: Any) -> Any:
+    if not isinstance(value, str):
+        return value
+    from ppaya_lambda_utils import json_utils
+    return json_utils.loads(value)
+
+
+def parse_enum(enum_class: Type[Enum], value: Any) -> Enum:
+    """
+    Enums are parsed by value, or by name.
+    """
+    if isinstance(value, enum_class):
+        return value
+    try:
+        return enum_class(value)
+    except ValueError:
+        return enum_class[value]
+
+
+def parse_value(cast_to: type, value: Any) -> Any:
+    return value if isinstance(value, cast_to) else cast_to(value)
+
+
+def _get_class_attr(
+        namespace: Dict[str, Any], bases: Tuple[type, ...], name: str, default: Any) -> Any:
+    """
+    Find an attribute of a class being created, without triggering descriptors.
+    """
+    if name in namespace:
+        return namespace[name]
+    for base in bases:
+        for klass in base.__mro__:
+            if name in klass.__dict__:
+                return klass.__dict__[name]
+    return default
+
+
+def _get_type_hint(cls: type, name: str) -> Any:
+    """
+    Return the evaluated type annotation of an attribute, or None if it
+    isn't annotated or the annotation can't be evaluated.
+    """
+    for klass in cls.__mro__:
+        annotations = klass.__dict__.get('__annotations__', {})
+        if name in annotations:
+            hint = annotations[name]
+            if isinstance(hint, str):
+                module = sys.modules.get(klass.__module__)
+                try:
+                    hint = eval(hint, vars(module) if module else {}, dict(vars(klass)))
+                except Exception:
+                    return None
+            return hint
+    return None
+
+
+class BaseSettings(object, metaclass=SettingsMeta):
     """
     A Settings class that adds functionality to retrieve values from environment
     variables and secrets from AWS SSM (Simple Systems Manager)
@@ -22,12 +280,26 @@ class BaseSettings(object):
 
     The parameter is expected to be an encrypted, JSON string.
 
-    Secrets must be explicitly loaded::
+    Values are parsed to the type annotation of the field, which is compiled
+    to a parser when the class is defined.  bool ("true" / "false", "1" /
+    "0", "yes" / "no", "on" / "off"), int, float, Decimal, str, List[...]
+    (a JSON array or comma separated values), Dict (a JSON object), Enum (by
+    value or name) and Optional types are supported.
+
+    Sub-classes which declare `__slots__`, eg `__slots__ = ()`, store their
+    fields in slots, which makes settings objects smaller and faster to
+    create.  Such sub-classes can only set the instance attributes listed
+    in their `__slots__`, and can't be combined by multiple inheritance with
+    other sub-classes which declare fields in their `__slots__`.
 
-        settings.load_settings()
+    Secrets are loaded when a secret field is first read, so invocations
+    that don't use the secrets don't fetch them.  They can also be loaded
+    explicitly, eg during lambda init::
 
-    This allows lazy loading the secrets at runtime and makes it easier to mock
-    during unit tests.
+        settings.load_secret_settings()
+
+    Set SECRETS_LOAD_ON_ACCESS to False to only load secrets explicitly,
+    which can make them easier to mock during unit tests.
 
     This is a poor mans implementation of the pydantic BaseSettings class,
     which unfortunately is too large a library to be included in a lambda
@@ -50,47 +322,290 @@ class BaseSettings(object):
             secret_fields: List[str] = [
                 'SOME_PASSWORD'
             ]
+
+    If SECRETS_REFRESH_IN_BACKGROUND is True, once secrets have been loaded
+    they are refreshed in a background thread after SECRETS_MAX_AGE, while
+    the cached values continue to be used, so SSM latency isn't added to an
+    invocation.  Only once the secrets are SECRETS_MAX_STALENESS seconds past
+    their expiry does loading block until they have been refreshed.  Note
+    that a background refresh is paused while the lambda execution
+    environment is frozen between invocations.
+
+    Secrets can also be loaded from multiple sources, which are fetched
+    together with as few requests as possible::
+
+        class MySettings(BaseSettings):
+            SECRETS_KEY = '/my-app/secrets'
+            # Further SSM parameters, fetched in batches of 10.
+            SECRETS_KEYS = ['/my-app/more-secrets', '/shared/secrets']
+            # SSM parameter hierarchies.  Parameters that aren't a JSON object
+            # are mapped to the field named by the last part of their path
+            # eg /my-app/by-path/SOME_PASSWORD.
+            SECRETS_PATHS = ['/my-app/by-path']
+            # Secrets Manager secrets.
+            SECRETS_MANAGER_IDS = ['my-app-secret']
+
+    Where a field is in multiple sources, the last source in the order above
+    takes precedence.
+
+    To spread out the refreshes of many lambda containers, the age at which
+    each container's secrets expire is reduced by a random fraction of up to
+    SECRETS_MAX_AGE_JITTER.  If a refresh fails once secrets have been
+    loaded, the cached values continue to be used (unless
+    SECRETS_SERVE_STALE_ON_ERROR is False) and a warning is logged.  Further
+    refreshes are then backed off exponentially, up to
+    SECRETS_RETRY_MAX_DELAY seconds, so a throttled SSM isn't overwhelmed.
     """
+    __slots__ = (
+        'SECRETS_LOADED_AT',
+        'USE_POWERTOOLS_LOGGING',
+        '_load_lock',
+        '_refresh_lock',
+        '_refresh_thread',
+        '_secrets_max_age',
+        '_refresh_failures',
+        '_refresh_retry_at',
+    )
+
     # Used internally for deterimining loading and caching behaviour.
-    SECRETS_LOADED_AT: Optional[float] = None
+    SECRETS_LOADED_AT: Optional[float]
     # Number of seconds secrets should be cached for.
     SECRETS_MAX_AGE: int = 30 * 60
+    # Refresh expired secrets in a background thread, serving the cached values
+    # for up to SECRETS_MAX_STALENESS seconds after expiry.
+    SECRETS_REFRESH_IN_BACKGROUND: bool = False
+    SECRETS_MAX_STALENESS: int = 30 * 60
+    # The maximum fraction by which SECRETS_MAX_AGE is randomly reduced.
+    SECRETS_MAX_AGE_JITTER: float = 0.1
+    # Serve cached secrets when a refresh fails, backing off further refreshes.
+    SECRETS_SERVE_STALE_ON_ERROR: bool = True
+    SECRETS_RETRY_BASE_DELAY: float = 5.0
+    SECRETS_RETRY_MAX_DELAY: float = 5 * 60
     # The key / path of the SSM Parameter containing the secrets.
     # This should be defined in sub-classes.
     SECRETS_KEY: str = '/path/to/secrets'
+    # Additional sources of secrets, see above.
+    SECRETS_KEYS: List[str] = []
+    SECRETS_PATHS: List[str] = []
+    SECRETS_MANAGER_IDS: List[str] = []
+    # Load secrets when a secret field is read.
+    SECRETS_LOAD_ON_ACCESS: bool = True
 
     environ_fields: List[str] = []
     secret_fields: List[str] = []
+    # The compiled fields, set by SettingsMeta.
+    _environ_field_table: Tuple[SettingsField, ...] = ()
+    _secret_field_table: Tuple[SettingsField, ...] = ()
 
     def __init__(self) -> None:
+        self.SECRETS_LOADED_AT = None
+        # Held while loading secrets.
+        self._load_lock = threading.Lock()
+        # Held while starting a background refresh.
+        self._refresh_lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+        # The jittered max age of the loaded secrets.
+        self._secrets_max_age: float = self.SECRETS_MAX_AGE
+        # Consecutive failures to refresh the secrets, and the timestamp
+        # before which refreshes are backed off.
+        self._refresh_failures = 0
+        self._refresh_retry_at: Optional[float] = None
         self.load_environ_settings()
         self.USE_POWERTOOLS_LOGGING = (
             'POWERTOOLS_METRICS_NAMESPACE' in os.environ)
 
     def load_environ_settings(self) -> None:
-        for name in self.environ_fields:
-            value = os.environ.get(name, None)
+        for field in self._environ_field_table:
+            value = os.environ.get(field.name, None)
             if value:
-                cast_to = type(getattr(self, name))
-                setattr(self, name, cast_to(value))
+                field.__set__(self, field.parse(value))
 
     def load_secret_settings(self) -> None:
-        if self._is_secret_load_required():
+        if not self._is_secret_load_required():
+            return
+
+        if self._can_serve_stale() and self._is_refresh_backing_off():
+            return
+
+        if self.SECRETS_REFRESH_IN_BACKGROUND and not self._is_secret_too_stale():
+            self._start_background_refresh()
+            return
+
+        # Blocks while a background refresh is in progress, after which the
+        # secrets will usually no longer need loading.
+        with self._load_lock:
+            if self._is_secret_load_required():
+                self._try_load_secrets(raise_errors=not self._can_serve_stale())
+
+    def _try_load_secrets(self, raise_errors: bool) -> None:
+        try:
+            self._load_secrets()
+        except Exception as err:
+            self._record_refresh_failure(err)
+            if raise_errors:
+                raise
+        else:
+            self._refresh_failures = 0
+            self._refresh_retry_at = None
+
+    def _load_secrets(self) -> None:
+        if self.SECRETS_KEYS or self.SECRETS_PATHS or self.SECRETS_MANAGER_IDS:
+            secrets: Any = self._fetch_secret_sources()
+        else:
+            from aws_lambda_powertools.utilities import parameters
+
             secrets = parameters.get_parameter(
                 self.SECRETS_KEY, decrypt=True, transform='json')
 
-            if isinstance(secrets, dict):
-                for name in self.secret_fields:
-                    value = secrets.get(name)
-                    if value:
-                        cast_to = type(getattr(self, name))
-                        setattr(self, name, cast_to(value))
+        if isinstance(secrets, dict):
+            for field in self._secret_field_table:
+                value = secrets.get(field.name)
+                if value is not None and value != '':
+                    field.__set__(self, field.parse(value))
+
+        self.SECRETS_LOADED_AT = datetime.utcnow().timestamp()
+        self._secrets_max_age = self.SECRETS_MAX_AGE * (
+            1 - random.uniform(0, self.SECRETS_MAX_AGE_JITTER))
+
+    def _fetch_secret_sources(self) -> Dict[str, Any]:
+        """
+        Fetch the secrets from all sources concurrently, merging them into
+        a single dictionary.
+        """
+        names = [
+            name for name in [self.SECRETS_KEY, *self.SECRETS_KEYS]
+            if name and name != BaseSettings.SECRETS_KEY]
+        fetches: List[Callable[[], List[Dict[str, Any]]]] = [
+            *[partial(fetch_ssm_parameters, names[x: x + 10])
+              for x in range(0, len(names), 10)],
+            *[partial(fetch_ssm_parameters_by_path, path) for path in self.SECRETS_PATHS],
+            *[partial(fetch_secrets_manager_secret, secret_id)
+              for secret_id in self.SECRETS_MANAGER_IDS],
+        ]
 
-            self.SECRETS_LOADED_AT = datetime.utcnow().timestamp()
+        from ppaya_lambda_utils.concurrency_utils import map_concurrently
+
+        secrets: Dict[str, Any] = {}
+        for result in map_concurrently(lambda fetch: fetch(), fetches):
+            if isinstance(result, Exception):
+                raise result
+            for source in result:
+                if isinstance(source, dict):
+                    secrets.update(source)
+        return secrets
+
+    def _start_background_refresh(self) -> None:
+        with self._refresh_lock:
+            if self._refresh_thread and self._refresh_thread.is_alive():
+                return
+            self._refresh_thread = threading.Thread(
+                target=self._refresh_secrets, name='settings-refresh', daemon=True)
+            self._refresh_thread.start()
+
+    def _refresh_secrets(self) -> None:
+        with self._load_lock:
+            if self._is_secret_load_required():
+                self._try_load_secrets(raise_errors=False)
+
+    def _record_refresh_failure(self, err: Exception) -> None:
+        """
+        Back off further refreshes and log the failure.
+        """
+        from ppaya_lambda_utils.batch_utils import get_backoff_delay
+
+        self._refresh_failures += 1
+        retry_in = get_backoff_delay(
+            self._refresh_failures, self.SECRETS_RETRY_BASE_DELAY,
+            self.SECRETS_RETRY_MAX_DELAY)
+        self._refresh_retry_at = datetime.utcnow().timestamp() + retry_in
+        logger.warning({
+            'msg': 'Failed to refresh secrets',
+            'secrets_key': self.SECRETS_KEY,
+            'error': str(err),
+            'serving_stale': self.SECRETS_LOADED_AT is not None,
+            'consecutive_failures': self._refresh_failures,
+            'retry_in_seconds': round(retry_in, 3),
+        })
+
+    def _can_serve_stale(self) -> bool:
+        return self.SECRETS_SERVE_STALE_ON_ERROR and self.SECRETS_LOADED_AT is not None
+
+    def _is_refresh_backing_off(self) -> bool:
+        return (
+            self._refresh_retry_at is not None
+            and datetime.utcnow().timestamp() < self._refresh_retry_at)
 
     def _is_secret_load_required(self) -> bool:
         if self.SECRETS_LOADED_AT:
-            expires_at = self.SECRETS_LOADED_AT + self.SECRETS_MAX_AGE
+            expires_at = self.SECRETS_LOADED_AT + self._secrets_max_age
             return datetime.utcnow().timestamp() > expires_at
         else:
             return True
+
+    def _is_secret_too_stale(self) -> bool:
+        """
+        Returns True if secrets haven't been loaded or are too old to be used
+        while being refreshed in the background.
+        """
+        if self.SECRETS_LOADED_AT:
+            stale_at = (
+                self.SECRETS_LOADED_AT + self._secrets_max_age + self.SECRETS_MAX_STALENESS)
+            return datetime.utcnow().timestamp() > stale_at
+        else:
+            return True
+
+
+def fetch_ssm_parameters(names: List[str]) -> List[Dict[str, Any]]:
+    """
+    Fetch up to 10 encrypted, JSON SSM parameters in a single request,
+    returning the decoded values in the same order as `names`.
+    """
+    from ppaya_lambda_utils import json_utils
+    from ppaya_lambda_utils.boto_utils import boto_clients
+
+    client = boto_clients.get_client('ssm', config=get_boto_config())
+    resp = client.get_parameters(Names=names, WithDecryption=True)
+    if resp.get('InvalidParameters'):
+        raise SettingsException(f'SSM parameters not found: {resp["InvalidParameters"]}')
+
+    values = {
+        parameter['Name']: json_utils.loads(parameter['Value'])
+        for parameter in resp['Parameters']}
+    return [values[name] for name in names]
+
+
+def fetch_ssm_parameters_by_path(path: str) -> List[Dict[str, Any]]:
+    """
+    Fetch all encrypted SSM parameters below `path`.  Parameters containing
+    a JSON object are returned as decoded, others as a dictionary mapping the
+    last part of the parameter name to its value.
+    """
+    from ppaya_lambda_utils import json_utils
+    from ppaya_lambda_utils.boto_utils import boto_clients
+
+    client = boto_clients.get_client('ssm', config=get_boto_config())
+    paginator = client.get_paginator('get_parameters_by_path')
+    result: List[Dict[str, Any]] = []
+    for page in paginator.paginate(Path=path, Recursive=True, WithDecryption=True):
+        for parameter in page['Parameters']:
+            try:
+                value = json_utils.loads(parameter['Value'])
+            except ValueError:
+                value = None
+            if isinstance(value, dict):
+                result.append(value)
+            else:
+                result.append({parameter['Name'].rsplit('/', 1)[-1]: parameter['Value']})
+    return result
+
+
+def fetch_secrets_manager_secret(secret_id: str) -> List[Dict[str, Any]]:
+    """
+    Fetch a Secrets Manager secret containing a JSON object.
+    """
+    from ppaya_lambda_utils import json_utils
+    from ppaya_lambda_utils.boto_utils import boto_clients
+
+    client = boto_clients.get_client('secretsmanager', config=get_boto_config())
+    resp = client.get_secret_value(SecretId=secret_id)
+    return [json_utils.loads(resp['SecretString'])]
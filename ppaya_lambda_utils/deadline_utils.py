@@ -0,0 +1,105 @@
+from __future__ import annotations
+from contextlib import contextmanager
+import math
+import time
+from typing import Iterator, Optional, TYPE_CHECKING
+
+from ppaya_lambda_utils.exceptions import DeadlineExceededException
+
+
+if TYPE_CHECKING:
+    from aws_lambda_powertools.utilities.typing import LambdaContext
+
+
+# The time, in milliseconds, left for handling a `DeadlineExceededException`
+# when helpers stop starting new operations.
+DEFAULT_MIN_REMAINING_TIME_MS: int = 1000
+
+# The deadline of the current invocation, as a `time.monotonic` timestamp.
+_deadline: Optional[float] = None
+
+
+def set_deadline(remaining_time_ms: Optional[int]) -> None:
+    """
+    Set the deadline of the current invocation to `remaining_time_ms`
+    milliseconds from now, or clear it if None.  This is done by
+    `observability_init_middleware`, otherwise use `deadline_scope`.
+    """
+    global _deadline
+    if remaining_time_ms is None:
+        _deadline = None
+    else:
+        _deadline = time.monotonic() + remaining_time_ms / 1000
+
+
+@contextmanager
+def deadline_scope(context: LambdaContext) -> Iterator[None]:
+    """
+    Set the deadline from the lambda `context` for the duration of the block,
+    so the I/O helpers of this library stop starting new operations before
+    the invocation times out.
+
+    Usage::
+
+        def lambda_handler(event, context):
+            with deadline_scope(context):
+                for item in paginated_results('scan', paginate_config):
+                    # per item logic
+    """
+    remaining_time_ms = context.get_remaining_time_in_millis()
+    set_deadline(remaining_time_ms if isinstance(remaining_time_ms, (int, float)) else None)
+    try:
+        yield
+    finally:
+        set_deadline(None)
+
+
+def get_remaining_time_ms() -> Optional[int]:
+    """
+    Return the milliseconds until the deadline, or None if no deadline is set.
+    """
+    if _deadline is None:
+        return None
+    return int((_deadline - time.monotonic()) * 1000)
+
+
+def has_time_remaining(min_remaining_time_ms: int = DEFAULT_MIN_REMAINING_TIME_MS) -> bool:
+    """
+    Return False if a deadline is set and fewer than `min_remaining_time_ms`
+    milliseconds remain before it.
+    """
+    remaining_time_ms = get_remaining_time_ms()
+    return remaining_time_ms is None or remaining_time_ms >= min_remaining_time_ms
+
+
+def check_deadline(
+        operation: str,
+        min_remaining_time_ms: int = DEFAULT_MIN_REMAINING_TIME_MS) -> None:
+    """
+    Raise a `DeadlineExceededException` if `operation` shouldn't be started
+    as fewer than `min_remaining_time_ms` milliseconds remain.
+    """
+    if not has_time_remaining(min_remaining_time_ms):
+        raise DeadlineExceededException(
+            f'{operation} not started with {get_remaining_time_ms()}ms remaining')
+
+
+def get_max_timeout(
+        min_remaining_time_ms: int = DEFAULT_MIN_REMAINING_TIME_MS) -> Optional[float]:
+    """
+    Return the maximum botocore timeout, in seconds, which leaves
+    `min_remaining_time_ms` before the deadline, or None if no deadline is
+    set.  None is also returned if there is no time available, as operations
+    shouldn't then be started, see `check_deadline`.
+
+    Timeouts are rounded down to a power of 2 seconds, eg 0.5 when less than
+    a second is available, so only a few differently configured clients are
+    created and cached by `BotoClients`.
+    """
+    remaining_time_ms = get_remaining_time_ms()
+    if remaining_time_ms is None:
+        return None
+    available = (remaining_time_ms - min_remaining_time_ms) / 1000
+    if available <= 0:
+        return None
+    return 2.0 ** math.floor(math.log2(available))
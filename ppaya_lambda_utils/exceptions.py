@@ -1,8 +1,37 @@
+from typing import Any
+
 
 class InvokeLambdaFunctionException(Exception):
     """ Raised when the invocation of a lamda function fails """
 
 
+class BatchEntryTooLargeException(Exception):
+    """ Raised when an entry is too large to be sent in a batch """
+
+
+class DeadlineExceededException(Exception):
+    """ Raised when there isn't enough time left in an invocation to start an operation """
+    def __init__(
+            self, msg: str, resume_token: Any = None, partial_result: Any = None) -> None:
+        super().__init__(msg)
+        # Used to resume the operation eg in a following invocation.
+        self.resume_token = resume_token
+        # The result of the part of the operation which was completed.
+        self.partial_result = partial_result
+
+
+class NotificationPublishException(Exception):
+    """ Raised when notifications fail to publish """
+    def __init__(self, msg: str, failed: Any) -> None:
+        super().__init__(msg)
+        # The failures reported by `publish_batch_to_sns`.
+        self.failed = failed
+
+
+class SettingsException(Exception):
+    """ Raised when settings can't be loaded """
+
+
 class WorkflowException(Exception):
     """ Raised when a workflow / state machine fails """
     def __init__(self, msg: str, error_type: str) -> None:
@@ -0,0 +1,206 @@
+from __future__ import annotations
+from dataclasses import asdict, dataclass
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+
+# Error codes returned by AWS when a request is throttled.
+THROTTLING_ERROR_CODES = frozenset([
+    'KMSThrottlingException',
+    'ProvisionedThroughputExceededException',
+    'RequestLimitExceeded',
+    'RequestThrottled',
+    'SlowDown',
+    'Throttling',
+    'ThrottlingException',
+    'TooManyRequestsException',
+])
+
+# The keys under which a call in progress, and the number of its attempts
+# which were throttled, are stored in the botocore request context.
+_CONTEXT_KEY = 'ppaya_call_stats'
+_THROTTLES_KEY = 'ppaya_call_throttles'
+
+
+@dataclass
+class OperationStats:
+    """
+    Aggregated statistics of the calls made to an AWS service operation.
+    `throttles` counts throttled attempts, so includes those retried.
+    """
+    calls: int = 0
+    errors: int = 0
+    throttles: int = 0
+    retries: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    request_bytes: int = 0
+    response_bytes: int = 0
+
+
+class AwsCallStats(object):
+    """
+    Collects statistics of the AWS calls made by boto clients, aggregated by
+    service and operation.  Clients created by `BotoClients` are instrumented
+    automatically, other clients can be instrumented with `instrument_client`.
+
+    `observability_init_middleware` resets the statistics at the start of each
+    invocation and emits them as metrics at the end.  Otherwise::
+
+        from ppaya_lambda_utils.instrumentation_utils import aws_call_stats
+
+        aws_call_stats.reset()
+        # make AWS calls
+        for (service, operation), stats in aws_call_stats.reset().items():
+            print(service, operation, stats.calls, stats.total_ms)
+    """
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, str], OperationStats] = {}
+
+    def record(
+            self,
+            service: str,
+            operation: str,
+            duration_ms: float,
+            retries: int = 0,
+            throttles: int = 0,
+            error: bool = False,
+            request_bytes: int = 0,
+            response_bytes: int = 0) -> None:
+        with self._lock:
+            stats = self._stats.setdefault((service, operation), OperationStats())
+            stats.calls += 1
+            stats.errors += int(error)
+            stats.throttles += throttles
+            stats.retries += retries
+            stats.total_ms += duration_ms
+            stats.max_ms = max(stats.max_ms, duration_ms)
+            stats.request_bytes += request_bytes
+            stats.response_bytes += response_bytes
+
+    def snapshot(self) -> Dict[Tuple[str, str], OperationStats]:
+        """
+        Return a copy of the statistics collected so far.
+        """
+        with self._lock:
+            return {key: OperationStats(**asdict(stats)) for key, stats in self._stats.items()}
+
+    def reset(self) -> Dict[Tuple[str, str], OperationStats]:
+        """
+        Clear the statistics, returning those collected so far.
+        """
+        with self._lock:
+            stats, self._stats = self._stats, {}
+        return stats
+
+
+aws_call_stats: AwsCallStats = AwsCallStats()
+
+
+def instrument_client(client: Any, stats: Optional[AwsCallStats] = None) -> None:
+    """
+    Register botocore event hooks on a boto client which record the latency,
+    retries, throttling, errors and request and response sizes of each call
+    in `stats`, by default the module `aws_call_stats`.  The latency of a
+    call includes any retries, and each throttled attempt is counted.
+    """
+    stats = stats or aws_call_stats
+
+    def before_call(model: Any, params: Dict[str, Any], context: Dict[str, Any],
+                    **kwargs: Any) -> None:
+        context[_CONTEXT_KEY] = (
+            model.service_model.service_name, model.name, time.perf_counter(),
+            get_body_size(params.get('body')))
+        context[_THROTTLES_KEY] = 0
+
+    def response_received(response_dict: Optional[Dict[str, Any]],
+                          parsed_response: Optional[Dict[str, Any]],
+                          context: Dict[str, Any], **kwargs: Any) -> None:
+        # Emitted for each attempt, unlike after-call which is emitted once
+        # the retries are done.
+        if response_dict is None or _THROTTLES_KEY not in context:
+            return
+        error_code = (parsed_response or {}).get('Error', {}).get('Code')
+        if error_code in THROTTLING_ERROR_CODES or response_dict['status_code'] == 429:
+            context[_THROTTLES_KEY] += 1
+
+    def after_call(http_response: Any, parsed: Dict[str, Any], context: Dict[str, Any],
+                   **kwargs: Any) -> None:
+        call = context.pop(_CONTEXT_KEY, None)
+        if call is None:
+            return
+        service, operation, started_at, request_bytes = call
+        stats.record(
+            service, operation,
+            duration_ms=(time.perf_counter() - started_at) * 1000,
+            retries=parsed.get('ResponseMetadata', {}).get('RetryAttempts', 0),
+            throttles=context.pop(_THROTTLES_KEY, 0),
+            error=http_response.status_code >= 300,
+            request_bytes=request_bytes,
+            # The content isn't read, as it may be a stream.
+            response_bytes=int(http_response.headers.get('content-length') or 0))
+
+    def after_call_error(context: Dict[str, Any], **kwargs: Any) -> None:
+        call = context.pop(_CONTEXT_KEY, None)
+        if call is None:
+            return
+        service, operation, started_at, request_bytes = call
+        stats.record(
+            service, operation,
+            duration_ms=(time.perf_counter() - started_at) * 1000,
+            throttles=context.pop(_THROTTLES_KEY, 0),
+            error=True,
+            request_bytes=request_bytes)
+
+    events = client.meta.events
+    events.register('before-call', before_call, unique_id=f'{_CONTEXT_KEY}-before-call')
+    events.register(
+        'response-received', response_received,
+        unique_id=f'{_CONTEXT_KEY}-response-received')
+    events.register('after-call', after_call, unique_id=f'{_CONTEXT_KEY}-after-call')
+    events.register(
+        'after-call-error', after_call_error, unique_id=f'{_CONTEXT_KEY}-after-call-error')
+
+
+def get_body_size(body: Any) -> int:
+    """
+    Return the size in bytes of a request body, or 0 for streamed bodies.
+    """
+    if isinstance(body, bytes):
+        return len(body)
+    if isinstance(body, str):
+        return len(body.encode('utf-8'))
+    if isinstance(body, dict):
+        # eg the form parameters of a query protocol request.
+        return sum(len(str(k)) + len(str(v)) for k, v in body.items())
+    return 0
+
+
+def add_aws_call_metrics(metrics: Any, logger: Any, stats: Optional[AwsCallStats] = None) -> None:
+    """
+    Emit the AWS call statistics collected since the last reset as metrics,
+    named eg `dynamodb.GetItem.duration`, and a summary log record, then
+    reset the statistics.
+    """
+    collected = (stats or aws_call_stats).reset()
+    if not collected:
+        return
+
+    for (service, operation), operation_stats in collected.items():
+        prefix = f'{service}.{operation}'
+        metrics.add_metric(name=f'{prefix}.calls', unit='Count', value=operation_stats.calls)
+        metrics.add_metric(
+            name=f'{prefix}.duration', unit='Milliseconds', value=operation_stats.total_ms)
+        for name in ('errors', 'throttles', 'retries'):
+            value = getattr(operation_stats, name)
+            if value:
+                metrics.add_metric(name=f'{prefix}.{name}', unit='Count', value=value)
+
+    logger.info({
+        'msg': 'AWS call summary',
+        'aws_calls': {
+            f'{service}.{operation}': asdict(operation_stats)
+            for (service, operation), operation_stats in collected.items()},
+    })
@@ -0,0 +1,197 @@
+from __future__ import annotations
+import codecs
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+import json
+import math
+import os
+from typing import Any, IO, Iterator, Optional, Union
+
+
+# The environment variable used to choose a JSON backend, either "orjson" or
+# "json".  By default orjson is used if it is installed.
+JSON_BACKEND_ENV_VAR = 'PPAYA_JSON_BACKEND'
+
+_backend: Optional[str] = None
+_orjson: Any = None
+
+
+def dumps(obj: Any) -> str:
+    """
+    Serialize `obj` to a compact JSON string.
+
+    In addition to the standard JSON types, Decimal, datetime, date, time,
+    Enum and dataclass values are supported, see `to_json_default`.
+    """
+    if get_json_backend() == 'orjson':
+        try:
+            result: str = _orjson.dumps(
+                obj, default=to_json_default,
+                option=_orjson.OPT_NON_STR_KEYS).decode('utf-8')
+            return result
+        except TypeError:
+            # eg integers larger than 64 bits, which orjson doesn't support.
+            pass
+    return json.dumps(
+        obj, default=to_json_default, ensure_ascii=False, separators=(',', ':'))
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """
+    Serialize `obj` to compact, UTF-8 encoded JSON bytes.  See `dumps`.
+    """
+    if get_json_backend() == 'orjson':
+        try:
+            result: bytes = _orjson.dumps(
+                obj, default=to_json_default, option=_orjson.OPT_NON_STR_KEYS)
+            return result
+        except TypeError:
+            pass
+    return json.dumps(
+        obj, default=to_json_default, ensure_ascii=False,
+        separators=(',', ':')).encode('utf-8')
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """
+    Deserialize a JSON string or bytes.
+    """
+    if get_json_backend() == 'orjson':
+        return _orjson.loads(data)
+    return json.loads(data)
+
+
+def iter_json_array(
+        stream: IO[Any], chunk_size: int = 64 * 1024) -> Iterator[Any]:
+    """
+    Incrementally decode a JSON array from a binary (UTF-8) or text stream,
+    yielding each item of the array in turn.  Only the current item, rather
+    than the whole document, is held in memory.
+
+    Usage::
+
+        with open('large.json', 'rb') as f:
+            for item in iter_json_array(f):
+                # process item
+
+    Raises a `ValueError` if the stream doesn't contain a JSON array.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    position = 0
+    eof = False
+    # One of "start", "first_item", "item", "separator"
+    expecting = 'start'
+
+    def read(size: int) -> None:
+        nonlocal buffer, position, eof
+        chunk = stream.read(size)
+        eof = not chunk
+        if isinstance(chunk, bytes):
+            chunk = text_decoder.decode(chunk, final=eof)
+        # Drop the consumed part of the buffer.
+        buffer = buffer[position:] + chunk
+        position = 0
+
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\n\r':
+            position += 1
+        if position == len(buffer):
+            if eof:
+                raise ValueError('Unexpected end of JSON array')
+            read(chunk_size)
+            continue
+
+        char = buffer[position]
+        if expecting == 'start':
+            if char != '[':
+                raise ValueError('Expected a JSON array')
+            position += 1
+            expecting = 'first_item'
+        elif expecting == 'separator' or (expecting == 'first_item' and char == ']'):
+            if char == ']':
+                return
+            if char != ',':
+                raise ValueError(f'Expected "," or "]" but found {char!r}')
+            position += 1
+            expecting = 'item'
+        else:
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                end = None
+            # Unless followed by a delimiter an item may be incomplete, eg a
+            # number split between chunks may decode as a shorter number.
+            if end is None or (
+                    not eof and (end == len(buffer) or buffer[end] not in ',] \t\n\r')):
+                # Read at least as much again as the partial item, so large
+                # items aren't decoded from the start too many times.
+                read(max(chunk_size, len(buffer) - position))
+                continue
+            yield item
+            position = end
+            expecting = 'separator'
+
+
+def to_json_default(obj: Any) -> Any:
+    """
+    Convert values that aren't natively supported by JSON to a serializable
+    value.  This is compatible with the aws_lambda_powertools JSON `Encoder`,
+    with the addition of dates, times and Enums:
+
+    - Decimal values are converted to strings to avoid losing precision.
+    - datetime, date and time values are converted to ISO 8601 strings.
+    - Enum values are converted to the value of the Enum.
+    - dataclasses are converted to dictionaries.
+    """
+    if isinstance(obj, Decimal):
+        return math.nan if obj.is_nan() else str(obj)
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    # Equivalent to `dataclasses.is_dataclass`, without importing dataclasses
+    # which is slow to import.
+    if hasattr(type(obj), '__dataclass_fields__'):
+        import dataclasses
+        return dataclasses.asdict(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def get_json_backend() -> str:
+    """
+    Return the name of the JSON backend in use, "orjson" or "json".
+    """
+    if _backend is None:
+        set_json_backend(os.environ.get(JSON_BACKEND_ENV_VAR))
+    assert _backend is not None
+    return _backend
+
+
+def set_json_backend(name: Optional[str] = None) -> None:
+    """
+    Set the JSON backend to "orjson" or "json".  If `name` is None, orjson is
+    used if it is installed.
+    """
+    global _backend, _orjson
+
+    if name not in (None, 'orjson', 'json'):
+        raise ValueError(f'Unknown JSON backend: {name}')
+
+    if name in (None, 'orjson'):
+        try:
+            import orjson
+        except ImportError:
+            if name == 'orjson':
+                raise
+        else:
+            _orjson = orjson
+            _backend = 'orjson'
+            return
+
+    _orjson = None
+    _backend = 'json'
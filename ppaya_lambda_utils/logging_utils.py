@@ -2,9 +2,12 @@ from __future__ import annotations
 from functools import partial
 import os
 import logging
-from typing import Union, Callable
+import random
+from typing import Any, Callable, Optional, Union, TYPE_CHECKING
 
-from aws_lambda_powertools import Logger
+
+if TYPE_CHECKING:
+    from aws_lambda_powertools import Logger
 
 
 def get_logger_factory(
@@ -26,11 +29,165 @@ def get_logger_factory(
         logger = get_logger_factory(__name__)()
     """
     if is_lambda_powertools_environment():
-        return lambda: Logger(child=True)
+        return create_powertools_child_logger
     else:
         return partial(logging.getLogger, logger_name)
 
 
+class LazyLogger(object):
+    """
+    A proxy for a logger which is only created, using the factory returned by
+    `get_logger_factory`, when it is first used.  This avoids importing
+    aws_lambda_powertools when a module using it is imported.
+
+    Usage::
+
+        from ppaya_lambda_utils.logging_utils import LazyLogger
+
+        logger = LazyLogger(__name__)
+    """
+    def __init__(self, logger_name: str) -> None:
+        self._logger_name = logger_name
+        self._logger: Optional[Union[logging.Logger, Logger]] = None
+
+    def __getattr__(self, name: str) -> Any:
+        if self._logger is None:
+            self._logger = get_logger_factory(self._logger_name)()
+        return getattr(self._logger, name)
+
+
+# Environment variables used to configure the default `LogPolicy`.
+LOG_MAX_FIELD_BYTES_ENV_VAR = 'PPAYA_LOG_MAX_FIELD_BYTES'
+LOG_PAYLOAD_SAMPLE_RATE_ENV_VAR = 'PPAYA_LOG_PAYLOAD_SAMPLE_RATE'
+
+
+class LogPolicy(object):
+    """
+    Limits the cost of the payloads, eg message bodies and events, logged
+    by this library.
+    """
+    def __init__(self, max_field_bytes: int = 8 * 1024, info_sample_rate: float = 1.0) -> None:
+        # The maximum size of each serialized payload field, larger fields
+        # are truncated.
+        self.max_field_bytes = max_field_bytes
+        # The fraction of INFO level payload logs that are logged.  Warnings
+        # and errors are always logged.
+        self.info_sample_rate = info_sample_rate
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, LogPolicy) and vars(self) == vars(other)
+
+    def __repr__(self) -> str:
+        return (
+            f'LogPolicy(max_field_bytes={self.max_field_bytes}, '
+            f'info_sample_rate={self.info_sample_rate})')
+
+
+_log_policy: Optional[LogPolicy] = None
+
+
+def get_log_policy() -> LogPolicy:
+    """
+    Return the `LogPolicy` in use.  By default this is configured with the
+    PPAYA_LOG_MAX_FIELD_BYTES and PPAYA_LOG_PAYLOAD_SAMPLE_RATE environment
+    variables.
+    """
+    global _log_policy
+    if _log_policy is None:
+        _log_policy = LogPolicy()
+        if os.environ.get(LOG_MAX_FIELD_BYTES_ENV_VAR):
+            _log_policy.max_field_bytes = int(os.environ[LOG_MAX_FIELD_BYTES_ENV_VAR])
+        if os.environ.get(LOG_PAYLOAD_SAMPLE_RATE_ENV_VAR):
+            _log_policy.info_sample_rate = float(
+                os.environ[LOG_PAYLOAD_SAMPLE_RATE_ENV_VAR])
+    return _log_policy
+
+
+def set_log_policy(policy: Optional[LogPolicy] = None) -> None:
+    """
+    Set the `LogPolicy`.  If `policy` is None, the default policy is used.
+    """
+    global _log_policy
+    _log_policy = policy
+
+
+def log_payload(
+        logger: Any, level: int, msg: str, **fields: Any) -> None:
+    """
+    Log a structured message containing payloads, applying the `LogPolicy`.
+
+    Nothing is serialized if `level` isn't enabled for the logger or the
+    message isn't sampled, so large payloads can be passed without cost.
+    Each field is truncated to `max_field_bytes` when serialized as JSON,
+    see `truncate_field`.  The record is attributed to the caller of this
+    function.
+
+    Usage::
+
+        log_payload(logger, logging.INFO, 'Publishing to SNS', body=message)
+    """
+    if not logger.isEnabledFor(level):
+        return
+    policy = get_log_policy()
+    if level <= logging.INFO and random.random() >= policy.info_sample_rate:
+        return
+
+    record = {'msg': msg}
+    for name, value in fields.items():
+        record[name] = truncate_field(value, policy.max_field_bytes)
+    getattr(logger, logging.getLevelName(level).lower())(
+        record, stacklevel=get_caller_stacklevel(logger))
+
+
+def get_caller_stacklevel(logger: Any) -> int:
+    """
+    Return the `stacklevel` attributing a record logged by a helper, such as
+    `log_payload`, to the caller of the helper.  aws_lambda_powertools
+    loggers wrap a standard logger, which adds a frame.
+    """
+    if isinstance(logger, LazyLogger):
+        logger = logger._logger
+    return 3 if type(logger).__module__.startswith('aws_lambda_powertools') else 2
+
+
+def truncate_field(value: Any, max_bytes: int) -> Any:
+    """
+    Return the JSON serialization of `value`, truncated to `max_bytes` with a
+    marker recording the number of bytes removed.  Strings are returned
+    unserialized and numbers, booleans and None as they are.
+
+    The serialization is returned rather than `value`, so payloads are only
+    serialized once rather than again by the logger.
+    """
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+
+    from ppaya_lambda_utils import json_utils
+
+    if isinstance(value, str):
+        serialized = value
+    elif isinstance(value, bytes):
+        serialized = value.decode('utf-8', errors='replace')
+    else:
+        try:
+            serialized = json_utils.dumps(value)
+        except (TypeError, ValueError):
+            serialized = str(value)
+
+    encoded = serialized.encode('utf-8')
+    if len(encoded) <= max_bytes:
+        return serialized
+    truncated = encoded[:max_bytes].decode('utf-8', errors='ignore')
+    return f'{truncated}...[truncated {len(encoded) - max_bytes} bytes]'
+
+
+def create_powertools_child_logger() -> Logger:
+    # Imported here as aws_lambda_powertools is slow to import and isn't
+    # required outside of a powertools environment.
+    from aws_lambda_powertools import Logger
+    return Logger(child=True)
+
+
 def is_lambda_powertools_environment() -> bool:
     """
     Use the 'POWERTOOLS_SERVICE_NAME' environment variable to deduce if
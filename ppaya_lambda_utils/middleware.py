@@ -1,12 +1,54 @@
 from __future__ import annotations
-from typing import Any, Callable, Dict, Optional, TYPE_CHECKING
+from functools import wraps
+import logging
+import math
+import os
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
 
-from aws_lambda_powertools.middleware_factory import lambda_handler_decorator
-from aws_lambda_powertools.utilities.typing import LambdaContext
+from ppaya_lambda_utils.deadline_utils import deadline_scope, DEFAULT_MIN_REMAINING_TIME_MS
+from ppaya_lambda_utils.logging_utils import LazyLogger, log_payload
 
 
 if TYPE_CHECKING:
     from aws_lambda_powertools import Logger, Metrics
+    from aws_lambda_powertools.utilities.typing import LambdaContext
+
+    from ppaya_lambda_utils.notification_utils import NotificationClient
+    from ppaya_lambda_utils.stores.idempotency import IdempotencyStore
+
+
+logger = LazyLogger(__name__)
+
+# Environment variables configuring `profiling_middleware`.
+PROFILING_ENABLED_ENV_VAR = 'PPAYA_PROFILING_ENABLED'
+PROFILING_SAMPLE_RATE_ENV_VAR = 'PPAYA_PROFILING_SAMPLE_RATE'
+PROFILING_TOP_N_ENV_VAR = 'PPAYA_PROFILING_TOP_N'
+
+# The time, in seconds, an in progress record of `idempotency_middleware`
+# prevents duplicates being handled, if the remaining time of the invocation
+# isn't known.
+DEFAULT_IN_PROGRESS_TTL = 900
+
+# Used to measure the init duration, from this module being imported during
+# the lambda init to the first invocation.
+_module_loaded_at = time.perf_counter()
+_cold_start = True
+
+
+def lambda_handler_decorator(middleware: Callable) -> Callable:
+    """
+    Equivalent to the aws_lambda_powertools `lambda_handler_decorator`, except
+    the powertools middleware factory is only imported when the middleware is
+    applied to a handler, rather than when this module is imported.
+    """
+    @wraps(middleware)
+    def decorator(*args: Any, **kwargs: Any) -> Any:
+        from aws_lambda_powertools.middleware_factory import (
+            lambda_handler_decorator as powertools_lambda_handler_decorator)
+        return powertools_lambda_handler_decorator(middleware)(*args, **kwargs)
+    return decorator
 
 
 @lambda_handler_decorator
@@ -21,17 +63,324 @@ def observability_init_middleware(
     """
     An aws_lambda_powertools middleware function setting up standard logging
     and metrics handling for lambda functions.
+
+    In addition to counts of succeeded and failed invocations, the following
+    performance metrics are recorded for each invocation:
+
+    - function_duration: the duration of the handler in milliseconds.
+    - cold_start: 1 for the first invocation of a lambda container, else 0.
+    - init_duration: for cold starts, the milliseconds from this module being
+      imported to the first invocation.
+    - peak_memory: the peak resident set size of the process in megabytes.
+    - remaining_time: the milliseconds remaining when the handler returns.
+
+    The deadline of the invocation is set while the handler runs, so the I/O
+    helpers of this library stop starting new operations before the lambda
+    times out, see `deadline_utils`.
+
+    The statistics of the AWS calls made by clients created by `BotoClients`
+    during the invocation are also added as metrics per service operation
+    and logged as a summary, see `instrumentation_utils.add_aws_call_metrics`.
     """
+    from ppaya_lambda_utils.instrumentation_utils import add_aws_call_metrics, aws_call_stats
+
+    global _cold_start
+
+    started_at = time.perf_counter()
+    cold_start = _cold_start
+    _cold_start = False
+
+    aws_call_stats.reset()
+
     if log_structure:
         logger.structure_logs(append=True, formatter_options=None, **log_structure)
     metrics.add_metadata(key='handler_name', value=handler.__module__)
     try:
-        result = handler(event, context)
+        with deadline_scope(context):
+            result = handler(event, context)
     except Exception as err:
         metrics.add_metric(name='function_failed', unit='Count', value=1)
-        logger.error(
-            {'msg': 'Function failed', 'error': str(err), 'event': event})
+        log_payload(
+            logger, logging.ERROR, 'Function failed', error=str(err), event=event)
         raise
     else:
         metrics.add_metric(name='function_succeeded', unit='Count', value=1)
+    finally:
+        add_performance_metrics(metrics, context, started_at, cold_start)
+        add_aws_call_metrics(metrics, logger)
+    return result
+
+
+@lambda_handler_decorator
+def sqs_batch_middleware(
+        handler: Callable,
+        event: Dict[str, Any],
+        context: LambdaContext,
+        max_workers: Optional[int] = None,
+        min_remaining_time_ms: int = DEFAULT_MIN_REMAINING_TIME_MS) -> Dict[str, Any]:
+    """
+    An aws_lambda_powertools middleware function turning a function handling
+    a single SQS message into a lambda handler for a batch of SQS records.
+
+    The handler is called with the decoded message, unwrapped from the SNS
+    envelope if published via SNS, and the SQS record, with up to
+    `max_workers` (by default `concurrency_utils.DEFAULT_MAX_WORKERS`)
+    records processed concurrently.  A partial batch response is returned,
+    so only failed records are retried.  See `sqs_utils.process_sqs_batch`.
+
+    Usage::
+
+        @metrics.log_metrics
+        @logger.inject_lambda_context
+        @observability_init_middleware(logger=logger, metrics=metrics)
+        @sqs_batch_middleware(max_workers=5)
+        def lambda_handler(message, record):
+            # process message
+
+    When used within `observability_init_middleware`, records aren't started
+    once fewer than `min_remaining_time_ms` milliseconds remain in the
+    invocation and are reported as failed.
+    """
+    from ppaya_lambda_utils.concurrency_utils import DEFAULT_MAX_WORKERS
+    from ppaya_lambda_utils.sqs_utils import process_sqs_batch
+
+    return process_sqs_batch(
+        event, handler, max_workers or DEFAULT_MAX_WORKERS,
+        min_remaining_time_ms=min_remaining_time_ms)
+
+
+@lambda_handler_decorator
+def idempotency_middleware(
+        handler: Callable,
+        event: Dict[str, Any],
+        context: LambdaContext,
+        store: IdempotencyStore,
+        event_key_jmespath: Optional[str] = None,
+        ttl: int = 3600,
+        in_progress_ttl: Optional[int] = None) -> Any:
+    """
+    An aws_lambda_powertools middleware function returning the stored result
+    for duplicate deliveries of an event, rather than handling it again.
+
+    Events are identified by a fingerprint of the event, or of the subset
+    selected by the JMESPath expression `event_key_jmespath` eg
+    "[detail.order_id, detail.status]".  Results are stored in `store` for
+    `ttl` seconds and cached per container, so a duplicate which hits the
+    container cache doesn't make any AWS calls.  Results must be JSON
+    serializable, see `json_utils.dumps`.
+
+    While the handler runs an in progress record makes concurrent duplicates
+    raise an `IdempotencyInProgressException`, so they are retried later.
+    The record expires after `in_progress_ttl` seconds, by default the
+    remaining time of the invocation.  If the handler raises, or the result
+    can't be stored, the record is deleted so the event can be retried.
+
+    Usage::
+
+        idempotency_store = MyIdempotencyStore()
+
+
+        @idempotency_middleware(store=idempotency_store, event_key_jmespath='detail')
+        def lambda_handler(event, context):
+            ...
+    """
+    from ppaya_lambda_utils.stores.idempotency import get_event_fingerprint
+
+    key = get_event_fingerprint(event, event_key_jmespath)
+    if in_progress_ttl is None:
+        remaining_time_ms = context.get_remaining_time_in_millis()
+        in_progress_ttl = (
+            math.ceil(remaining_time_ms / 1000)
+            if isinstance(remaining_time_ms, (int, float)) else DEFAULT_IN_PROGRESS_TTL)
+
+    found, result = store.start(key, in_progress_ttl)
+    if found:
+        return result
+    try:
+        result = handler(event, context)
+    except Exception:
+        store.release(key)
+        raise
+    try:
+        store.complete(key, result, ttl)
+    except Exception as err:
+        log_payload(
+            logger, logging.ERROR, 'Failed to store idempotent result', key=key,
+            error=str(err))
+        store.release(key)
+        raise
+    return result
+
+
+@lambda_handler_decorator
+def notification_flush_middleware(
+        handler: Callable,
+        event: Dict[str, Any],
+        context: LambdaContext,
+        client: NotificationClient) -> Any:
+    """
+    An aws_lambda_powertools middleware function buffering the notifications
+    sent with `client` during the invocation and publishing them in batches
+    when the handler returns or raises.
+
+    A `NotificationPublishException`, listing the failures, is raised if
+    notifications fail to publish after the handler succeeded.
+
+    Usage::
+
+        notification_client = NotificationClient(settings.NOTIFICATION_TOPIC)
+
+
+        @notification_flush_middleware(client=notification_client)
+        def lambda_handler(event, context):
+            notification_client.send_admin_notification(...)
+    """
+    with client:
+        return handler(event, context)
+
+
+@lambda_handler_decorator
+def profiling_middleware(
+        handler: Callable,
+        event: Dict[str, Any],
+        context: LambdaContext,
+        logger: Logger,
+        *args, **kwargs) -> Any:
+    """
+    An aws_lambda_powertools middleware function profiling a sample of
+    invocations in production, to see where the time and memory of a handler
+    goes without redeploying it.
+
+    Profiling is switched on by setting the PPAYA_PROFILING_ENABLED
+    environment variable to "true".  A fraction PPAYA_PROFILING_SAMPLE_RATE
+    (by default 0.01) of invocations are then run with cProfile and
+    tracemalloc, and a single "Invocation profile" record is logged with the
+    top PPAYA_PROFILING_TOP_N (by default 20) functions by cumulative time
+    and the allocation sites with the most memory allocated.  When profiling
+    isn't enabled or an invocation isn't sampled, the overhead is an
+    environment variable lookup.
+
+    Usage::
+
+        @logger.inject_lambda_context
+        @profiling_middleware(logger=logger)
+        def lambda_handler(event, context):
+            ...
+    """
+    if os.environ.get(PROFILING_ENABLED_ENV_VAR, '').lower() != 'true':
+        return handler(event, context)
+    sample_rate = float(os.environ.get(PROFILING_SAMPLE_RATE_ENV_VAR) or 0.01)
+    if random.random() >= sample_rate:
+        return handler(event, context)
+
+    top_n = int(os.environ.get(PROFILING_TOP_N_ENV_VAR) or 20)
+    result, profile = profile_call(handler, event, context, top_n=top_n)
+    logger.info({'msg': 'Invocation profile', 'handler_name': handler.__module__, **profile})
     return result
+
+
+def profile_call(
+        func: Callable, *args: Any, top_n: int = 20, **kwargs: Any) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Call `func` with cProfile and tracemalloc enabled, returning its result
+    and a summary of the profile.  If `func` raises, the profile is lost.
+
+    The summary contains the duration, the top `top_n` functions by
+    cumulative time, the `top_n` source lines which allocated the most
+    memory still held at the end of the call and the peak traced memory.
+    """
+    import cProfile
+    import pstats
+    import tracemalloc
+
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    elif hasattr(tracemalloc, 'reset_peak'):
+        # Python 3.9+
+        tracemalloc.reset_peak()
+    profiler = cProfile.Profile()
+    started_at = time.perf_counter()
+    try:
+        profiler.enable()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            profiler.disable()
+        duration_ms = (time.perf_counter() - started_at) * 1000
+        snapshot = tracemalloc.take_snapshot()
+        __, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+
+    stats = pstats.Stats(profiler)
+    function_stats = sorted(
+        stats.stats.items(),  # type: ignore[attr-defined]
+        key=lambda item: item[1][3], reverse=True)
+    functions: List[Dict[str, Any]] = [
+        {
+            'function': f'{filename}:{line}({name})',
+            'calls': calls,
+            'total_ms': round(total_time * 1000, 3),
+            'cumulative_ms': round(cumulative_time * 1000, 3),
+        }
+        for (filename, line, name), (__, calls, total_time, cumulative_time, __)
+        in function_stats[:top_n]
+    ]
+
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, cProfile.__file__),
+    ])
+    allocations: List[Dict[str, Any]] = [
+        {
+            'location': str(statistic.traceback),
+            'size_kb': round(statistic.size / 1024, 3),
+            'count': statistic.count,
+        }
+        for statistic in snapshot.statistics('lineno')[:top_n]
+    ]
+
+    return result, {
+        'duration_ms': round(duration_ms, 3),
+        'functions': functions,
+        'allocations': allocations,
+        'peak_traced_memory_kb': round(peak_memory / 1024, 3),
+    }
+
+
+def add_performance_metrics(
+        metrics: Metrics, context: LambdaContext, started_at: float,
+        cold_start: bool) -> None:
+    """
+    Add the performance metrics of an invocation recorded by
+    `observability_init_middleware`.
+    """
+    duration_ms = (time.perf_counter() - started_at) * 1000
+    metrics.add_metric(name='function_duration', unit='Milliseconds', value=duration_ms)
+    metrics.add_metric(name='cold_start', unit='Count', value=int(cold_start))
+    if cold_start:
+        init_duration_ms = (started_at - _module_loaded_at) * 1000
+        metrics.add_metric(name='init_duration', unit='Milliseconds', value=init_duration_ms)
+
+    peak_memory_mb = get_peak_memory_mb()
+    if peak_memory_mb is not None:
+        metrics.add_metric(name='peak_memory', unit='Megabytes', value=peak_memory_mb)
+
+    remaining_time_ms = context.get_remaining_time_in_millis()
+    if isinstance(remaining_time_ms, (int, float)):
+        metrics.add_metric(name='remaining_time', unit='Milliseconds', value=remaining_time_ms)
+
+
+def get_peak_memory_mb() -> Optional[float]:
+    """
+    Return the peak resident set size of the process in megabytes, or None if
+    the `resource` module isn't available eg on Windows.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in kilobytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
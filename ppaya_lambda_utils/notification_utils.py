@@ -1,8 +1,19 @@
-from datetime import datetime, timezone
-import pytz
-from typing import Any, Dict, List, Optional
+from datetime import datetime, timezone, tzinfo
+from functools import lru_cache
+import threading
+from types import TracebackType
+from typing import Any, Dict, Iterable, List, Optional, Type
 
-from ppaya_lambda_utils.boto_utils import boto_clients, publish_to_sns
+from ppaya_lambda_utils import json_utils
+from ppaya_lambda_utils.batch_utils import BatchResult, get_entry_size, MAX_BATCH_BYTES
+from ppaya_lambda_utils.boto_utils import (
+    boto_clients, publish_batch_to_sns, publish_to_sns, to_sns_json_message)
+from ppaya_lambda_utils.concurrency_utils import DEFAULT_MAX_WORKERS
+from ppaya_lambda_utils.exceptions import NotificationPublishException
+from ppaya_lambda_utils.logging_utils import LazyLogger
+
+
+logger = LazyLogger(__name__)
 
 
 class NotificationClient(object):
@@ -16,22 +27,117 @@ class NotificationClient(object):
         client.send_admin_notification(
             'my_template', 'My subject', {'data': 'blah'}
         )
+
+    Each notification is published as it is sent, unless the client is used
+    as a context manager.  Notifications are then buffered and published when
+    the block exits, with SNS `PublishBatch` calls made with up to
+    `max_workers` concurrently::
+
+        with client:
+            for order in orders:
+                client.send_customer_notification(...)
+
+    Or for the whole invocation with `middleware.notification_flush_middleware`.
+
+    Customer notifications too large for an SNS message are split into
+    several notifications by recipient, see `split_customer_notification`.
     """
-    def __init__(self, sns_topic: str) -> None:
+    # The maximum size of a published message, including its attributes.
+    max_message_bytes: int = MAX_BATCH_BYTES
+    message_attributes: Dict[str, Any] = {
+        'event_type': {
+            'DataType': 'String', 'StringValue': 'notify'
+        }
+    }
+
+    def __init__(self, sns_topic: str, max_workers: int = DEFAULT_MAX_WORKERS) -> None:
         self.sns_topic = sns_topic
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        # The messages waiting to be published, or None if not buffering.
+        self._buffer: Optional[List[Dict[str, Any]]] = None
+        # The number of nested `with` blocks, the buffer is only flushed when
+        # the outermost block exits.
+        self._depth = 0
+
+    def __enter__(self) -> 'NotificationClient':
+        with self._lock:
+            self._depth += 1
+            if self._buffer is None:
+                self._buffer = []
+        return self
+
+    def __exit__(
+            self,
+            exc_type: Optional[Type[BaseException]],
+            exc_value: Optional[BaseException],
+            traceback: Optional[TracebackType]) -> None:
+        with self._lock:
+            self._depth -= 1
+            if self._depth:
+                return
+        try:
+            result = self.flush()
+        except Exception:
+            if exc_type is None:
+                raise
+            # Don't hide the exception raised in the `with` block.
+            logger.exception('Failed to flush notifications')
+            return
+        finally:
+            with self._lock:
+                if not self._depth:
+                    self._buffer = None
+        if result.failed and exc_type is None:
+            raise NotificationPublishException(
+                f'Failed to publish {len(result.failed)} notifications', result.failed)
 
     def publish_notification(self, event: Dict[str, Any]) -> None:
-        msg = {
-            'timestamp': datetime.now(timezone.utc).isoformat(),
-            'event': event,
-        }
-        msg_attr = {
-            'event_type': {
-                'DataType': 'String', 'StringValue': 'notify'
-            }
-        }
+        self.publish_notifications([event])
+
+    def publish_notifications(self, events: List[Dict[str, Any]]) -> None:
+        """
+        Publish notification events, or buffer them if the client is used as
+        a context manager.  Multiple events are published with concurrent SNS
+        `PublishBatch` calls, raising a `NotificationPublishException` if any
+        fail, including any too large to publish, once the others have been
+        published.
+        """
+        timestamp = datetime.now(timezone.utc).isoformat()
+        msgs = [{'timestamp': timestamp, 'event': event} for event in events]
+        with self._lock:
+            if self._buffer is not None:
+                self._buffer.extend(msgs)
+                return
+        sns = boto_clients.get_client('sns')
+        if len(msgs) == 1:
+            publish_to_sns(sns, self.sns_topic, msgs[0], self.message_attributes)
+            return
+        result = publish_batch_to_sns(
+            sns, self.sns_topic, msgs, self.message_attributes,
+            max_workers=self.max_workers, raise_too_large=False)
+        if result.failed:
+            raise NotificationPublishException(
+                f'Failed to publish {len(result.failed)} notifications', result.failed)
+
+    def flush(self) -> BatchResult:
+        """
+        Publish the buffered notifications.  Failed notifications, including
+        any too large to publish, are logged and returned in the `failed` list
+        of the result, see `publish_batch_to_sns`, where the `Id` of each
+        failure is the index of the notification among those buffered since
+        the last flush.
+        """
+        with self._lock:
+            messages = self._buffer or []
+            if self._buffer is not None:
+                self._buffer = []
+        if not messages:
+            return BatchResult()
         sns = boto_clients.get_client('sns')
-        publish_to_sns(sns, self.sns_topic, msg, msg_attr)
+        return publish_batch_to_sns(
+            sns, self.sns_topic, messages, self.message_attributes,
+            max_workers=self.max_workers, raise_too_large=False)
 
     def send_admin_notification(
         self,
@@ -71,15 +177,132 @@ class NotificationClient(object):
         if recipients_context:
             event['recipients_context'] = recipients_context
 
-        self.publish_notification(event)
+        max_bytes = self.max_message_bytes - get_entry_size(
+            {'MessageAttributes': self.message_attributes})
+        self.publish_notifications(split_customer_notification(event, max_bytes))
+
+
+# The longest timestamp of a published notification.
+_MAX_TIMESTAMP = datetime.max.replace(tzinfo=timezone.utc).isoformat()
+
+
+def split_customer_notification(
+    event: Dict[str, Any], max_bytes: int
+) -> List[Dict[str, Any]]:
+    """
+    Split a customer notification event into events which are each at most
+    `max_bytes` when published, by splitting the recipients into chunks.
+    Each chunk has the `recipients_context` of its own recipients and the
+    shared `context`.
+
+    A recipient whose own context is too large is put in a chunk by itself.
+    When published with `NotificationClient.publish_notifications` the other
+    chunks are still published, and the oversized chunk is reported in the
+    `failed` list of the `NotificationPublishException` raised, with a
+    `BatchEntryTooLargeException` code and the message naming the recipient.
+    """
+    def get_message_bytes(event: Dict[str, Any]) -> int:
+        msg = {'timestamp': _MAX_TIMESTAMP, 'event': event}
+        return len(to_sns_json_message(msg).encode('utf-8'))
+
+    if get_message_bytes(event) <= max_bytes:
+        return [event]
+
+    recipients_context = event.get('recipients_context') or {}
+    empty_chunk_bytes = get_message_bytes(
+        {**event, 'recipients': [], 'recipients_context': {}})
+    chunk_bytes = empty_chunk_bytes
+    chunks: List[List[str]] = [[]]
+    for recipient in event['recipients']:
+        # The size of the recipient and its context in the message, which
+        # is a JSON string embedded in the JSON envelope so is escaped.
+        fragment = json_utils.dumps(recipient) + ','
+        if recipient in recipients_context:
+            fragment += (
+                json_utils.dumps(recipient) + ':'
+                + json_utils.dumps(recipients_context[recipient]) + ',')
+        recipient_bytes = len(json_utils.dumps(fragment).encode('utf-8')) - 2
+        if chunks[-1] and chunk_bytes + recipient_bytes > max_bytes:
+            chunks.append([])
+            chunk_bytes = empty_chunk_bytes
+        chunks[-1].append(recipient)
+        chunk_bytes += recipient_bytes
+
+    events: List[Dict[str, Any]] = []
+    for chunk in chunks:
+        chunk_event = {**event, 'recipients': chunk}
+        chunk_event.pop('recipients_context', None)
+        chunk_context = {
+            recipient: recipients_context[recipient]
+            for recipient in chunk if recipient in recipients_context}
+        if chunk_context:
+            chunk_event['recipients_context'] = chunk_context
+        events.append(chunk_event)
+    return events
+
+
+# The format of datetimes displayed in notifications eg
+# "29 Oct 2021, 12:45 PM (BST)".
+DISPLAY_DATETIME_FORMAT = '%d %b %Y, %H:%M %p (%Z)'
+
+
+@lru_cache(maxsize=None)
+def get_timezone(tz_name: str) -> tzinfo:
+    """
+    Return the `zoneinfo` timezone named `tz_name` eg "Europe/London".
+    """
+    try:
+        from zoneinfo import ZoneInfo
+    except ImportError:
+        # Python < 3.9
+        from backports.zoneinfo import ZoneInfo  # type: ignore
+    return ZoneInfo(tz_name)
+
+
+class DisplayDatetimeFormatter(object):
+    """
+    Formats datetimes for display in notifications, in the timezone
+    `tz_name`.  Naive datetimes are treated as UTC.
+
+    Use `format_many` to format a sequence of datetimes, eg when rendering
+    the `recipients_context` of many recipients, which formats repeated
+    datetimes once::
+
+        formatter = get_display_datetime_formatter('Europe/London')
+        displayed = formatter.format_many([order.created_at for order in orders])
+    """
+    def __init__(
+        self, tz_name: str = 'Europe/London', fmt: str = DISPLAY_DATETIME_FORMAT
+    ) -> None:
+        self.tz = get_timezone(tz_name)
+        self.fmt = fmt
+
+    def format(self, dt: datetime) -> str:
+        if not dt.tzinfo:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt.astimezone(self.tz).strftime(self.fmt)
+
+    def format_many(self, dts: Iterable[datetime]) -> List[str]:
+        formatted: Dict[datetime, str] = {}
+        results: List[str] = []
+        for dt in dts:
+            try:
+                results.append(formatted[dt])
+            except KeyError:
+                formatted[dt] = self.format(dt)
+                results.append(formatted[dt])
+        return results
+
+
+@lru_cache(maxsize=None)
+def get_display_datetime_formatter(tz_name: str = 'Europe/London') -> DisplayDatetimeFormatter:
+    """
+    Return a shared `DisplayDatetimeFormatter` for `tz_name`.
+    """
+    return DisplayDatetimeFormatter(tz_name)
 
 
 def to_notification_display_datetime(
     dt: datetime, tz_name: str = 'Europe/London'
 ) -> str:
-    if not dt.tzinfo:
-        dt = dt.replace(tzinfo=pytz.utc)
-
-    tz = pytz.timezone(tz_name)
-    dt_local = dt.astimezone(tz)
-    return dt_local.strftime('%d %b %Y, %H:%M %p (%Z)')
+    return get_display_datetime_formatter(tz_name).format(dt)
@@ -0,0 +1,111 @@
+from __future__ import annotations
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+from ppaya_lambda_utils import json_utils
+from ppaya_lambda_utils.concurrency_utils import DEFAULT_MAX_WORKERS, map_concurrently
+from ppaya_lambda_utils.deadline_utils import DEFAULT_MIN_REMAINING_TIME_MS
+from ppaya_lambda_utils.logging_utils import LazyLogger, log_payload
+
+
+logger = LazyLogger(__name__)
+
+# Called with the decoded message and the SQS record.
+RecordHandler = Callable[[Any, Dict[str, Any]], Any]
+
+
+def decode_sqs_message(record: Dict[str, Any]) -> Any:
+    """
+    Decode the message of an SQS event record.
+
+    Messages published to SNS and delivered to SQS, eg by `publish_to_sns`,
+    are unwrapped from the SNS notification, identified by its `Type`, and
+    the `default` message of a `json` message structure, and decoded.  Other
+    JSON bodies are decoded and bodies which aren't JSON are returned as they
+    are.
+    """
+    body = record['body']
+    try:
+        message = json_utils.loads(body)
+    except ValueError:
+        return body
+
+    if (isinstance(message, dict) and message.get('Type') == 'Notification'
+            and isinstance(message.get('Message'), str)):
+        # An SNS notification.
+        try:
+            message = json_utils.loads(message['Message'])
+        except ValueError:
+            return message['Message']
+        if isinstance(message, dict) and list(message) == ['default']:
+            message = json_utils.loads(message['default'])
+    return message
+
+
+def process_sqs_batch(
+        event: Dict[str, Any],
+        record_handler: RecordHandler,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        get_remaining_time_ms: Optional[Callable[[], Optional[int]]] = None,
+        min_remaining_time_ms: int = DEFAULT_MIN_REMAINING_TIME_MS) -> Dict[str, Any]:
+    """
+    Call `record_handler` with the decoded message and record of each record
+    of an SQS event, with up to `max_workers` records processed concurrently.
+
+    Returns a partial batch response, listing the records which failed, so
+    only those are retried.  The event source mapping must have
+    `ReportBatchItemFailures` enabled::
+
+        def lambda_handler(event, context):
+            return process_sqs_batch(event, process_message)
+
+    Records of FIFO queues are processed in order within each message group.
+    After a record fails, the following records of its group are not
+    processed and are also reported as failed, preserving their order.
+
+    Records aren't started once fewer than `min_remaining_time_ms`
+    milliseconds remain, see `map_concurrently`, and are reported as failed.
+    """
+    records: List[Dict[str, Any]] = event.get('Records', [])
+
+    # Records are grouped by FIFO message group, other records are processed
+    # independently.
+    groups: Dict[Any, List[Dict[str, Any]]] = {}
+    for index, record in enumerate(records):
+        group_id = record.get('attributes', {}).get('MessageGroupId')
+        groups.setdefault(index if group_id is None else group_id, []).append(record)
+
+    def process_group(group: List[Dict[str, Any]]) -> List[Exception]:
+        errors: List[Exception] = []
+        for record in group:
+            if errors:
+                errors.append(errors[0])
+                continue
+            try:
+                record_handler(decode_sqs_message(record), record)
+            except Exception as err:
+                errors.append(err)
+        return errors
+
+    group_records = list(groups.values())
+    results = map_concurrently(
+        process_group, group_records, max_workers, get_remaining_time_ms,
+        min_remaining_time_ms)
+
+    failures: List[Dict[str, Any]] = []
+    errors: List[str] = []
+    for group, result in zip(group_records, results):
+        group_errors = [result] * len(group) if isinstance(result, Exception) else result
+        failed = group[len(group) - len(group_errors):]
+        failures.extend(failed)
+        errors.extend(str(err) for err in group_errors[:1])
+
+    if failures:
+        log_payload(
+            logger, logging.WARNING, f'{len(failures)} of {len(records)} records failed',
+            message_ids=[record['messageId'] for record in failures],
+            errors=sorted(set(errors)))
+    return {
+        'batchItemFailures': [
+            {'itemIdentifier': record['messageId']} for record in failures],
+    }
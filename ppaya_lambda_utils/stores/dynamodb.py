@@ -1,9 +1,10 @@
 from __future__ import annotations
 from typing import Any, Dict, Generator, Optional, TYPE_CHECKING
 
-from boto3.dynamodb.types import TypeDeserializer
-
 from ppaya_lambda_utils.boto_utils import boto_clients
+from ppaya_lambda_utils.deadline_utils import (
+    DEFAULT_MIN_REMAINING_TIME_MS, get_max_timeout, has_time_remaining)
+from ppaya_lambda_utils.exceptions import DeadlineExceededException
 from ppaya_lambda_utils.stores.exceptions import ItemNotFoundException
 
 
@@ -32,6 +33,8 @@ class DynamoDBStore(object):
 
         my_store = MyStore()
 
+    The dynamodb resource is shared via `boto_clients`, so it can be created
+    during the lambda init phase with `boto_clients.prewarm(resources=['dynamodb'])`.
     """
     table_name: Optional[str] = None
     _table: Optional[Table] = None
@@ -74,12 +77,16 @@ class DynamoDBStore(object):
 
 
 def from_dynamodb_to_json(item) -> Dict[str, Any]:
+    from boto3.dynamodb.types import TypeDeserializer
+
     deserializer = TypeDeserializer()
     return {k: deserializer.deserialize(value=v) for k, v in item.items()}
 
 
 def paginated_results(
-    operation: str, paginate_config: Dict[str, Any]
+    operation: str,
+    paginate_config: Dict[str, Any],
+    min_remaining_time_ms: int = DEFAULT_MIN_REMAINING_TIME_MS,
 ) -> Generator[Dict[str, Any], None, None]:
     """
     Yield items from a paginator for a given operation and config.
@@ -92,10 +99,38 @@ def paginated_results(
         }
         for item in paginated_results('scan', paginate_config):
             # per item logic
+
+    If an invocation deadline is set, see `deadline_utils`, no more pages are
+    fetched once fewer than `min_remaining_time_ms` milliseconds remain.  A
+    `DeadlineExceededException` is raised with a `resume_token`, the
+    `LastEvaluatedKey` of the last page fetched, which can be used as the
+    `ExclusiveStartKey` to continue from the next page eg in another
+    invocation::
+
+        try:
+            for item in paginated_results('scan', paginate_config):
+                # per item logic
+        except DeadlineExceededException as err:
+            paginate_config['ExclusiveStartKey'] = err.resume_token
+            # continue later
     """
-    client = boto_clients.get_client('dynamodb')
-    paginator = client.get_paginator(operation)
-    response_iterator = paginator.paginate(**paginate_config)
-    for response in response_iterator:
+    pages = None
+    resume_token = paginate_config.get('ExclusiveStartKey')
+    while True:
+        if not has_time_remaining(min_remaining_time_ms):
+            raise DeadlineExceededException(
+                f'Paginating {operation} stopped before the deadline',
+                resume_token=resume_token)
+
+        if pages is None:
+            client = boto_clients.get_client('dynamodb', max_timeout=get_max_timeout())
+            pages = iter(client.get_paginator(operation).paginate(**paginate_config))
+        try:
+            response = next(pages)
+        except StopIteration:
+            return
         for item in response['Items']:
             yield from_dynamodb_to_json(item)
+        resume_token = response.get('LastEvaluatedKey')
+        if resume_token is None:
+            return
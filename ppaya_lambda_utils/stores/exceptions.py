@@ -9,3 +9,7 @@ class MultipleItemsFoundException(Exception):
 
 class ItemAlreadyExistsException(Exception):
     """ Raised when an item already exists """
+
+
+class IdempotencyInProgressException(Exception):
+    """ Raised when a duplicate event is already being handled """
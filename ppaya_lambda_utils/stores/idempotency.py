@@ -0,0 +1,167 @@
+from __future__ import annotations
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from ppaya_lambda_utils import json_utils
+from ppaya_lambda_utils.stores.dynamodb import DynamoDBStore
+from ppaya_lambda_utils.stores.exceptions import IdempotencyInProgressException
+
+
+# The status of an idempotency record.
+IN_PROGRESS = 'IN_PROGRESS'
+COMPLETED = 'COMPLETED'
+
+
+def get_event_fingerprint(event: Any, jmespath_expression: Optional[str] = None) -> str:
+    """
+    Return a SHA-256 hash identifying an event, or the subset of the event
+    selected by a JMESPath expression eg "Records[].messageId".  Dictionary
+    key order doesn't change the fingerprint.
+    """
+    if jmespath_expression:
+        import jmespath
+        event = jmespath.search(jmespath_expression, event)
+    canonical = json.dumps(
+        event, sort_keys=True, separators=(',', ':'), default=json_utils.to_json_default)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class ResultCache(object):
+    """
+    A thread safe, least recently used cache of results which expire after a
+    time to live.
+    """
+    def __init__(self, max_size: int = 256) -> None:
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        # Maps keys to (expires at, result).
+        self._results: OrderedDict[str, Tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """
+        Returns (True, result) if a result is cached, otherwise (False, None).
+        """
+        with self._lock:
+            try:
+                expires_at, result = self._results[key]
+            except KeyError:
+                return False, None
+            if expires_at <= time.time():
+                del self._results[key]
+                return False, None
+            self._results.move_to_end(key)
+            return True, result
+
+    def put(self, key: str, result: Any, expires_at: float) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._results[key] = (expires_at, result)
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+
+
+class IdempotencyStore(DynamoDBStore):
+    """
+    Stores the results of handling events, so that duplicate deliveries of
+    an event can return the stored result rather than being handled again.
+    Used by `middleware.idempotency_middleware`.
+
+    Results are cached in a per container `ResultCache` and in a dynamodb
+    table, with the `PK` / `SK` key schema of `DynamoDBStore`.  Records
+    expire after a time to live, the table should have TTL enabled on the
+    `expires_at` attribute so expired records are deleted.
+
+    While an event is being handled an in progress record prevents a
+    concurrent duplicate being handled at the same time, instead an
+    `IdempotencyInProgressException` is raised.  The record expires if the
+    handler doesn't complete, eg if the lambda times out.
+
+    Usage::
+
+        class MyIdempotencyStore(IdempotencyStore):
+            table_name = 'my-idempotency-table'
+
+
+        idempotency_store = MyIdempotencyStore()
+    """
+    # The maximum number of results cached per container.
+    local_cache_size: int = 256
+
+    def __init__(self) -> None:
+        self.local_cache = ResultCache(self.local_cache_size)
+
+    def start(self, key: str, in_progress_ttl: float) -> Tuple[bool, Any]:
+        """
+        Returns (True, result) if a result is stored for `key`.  Otherwise
+        stores an in progress record expiring in `in_progress_ttl` seconds
+        and returns (False, None).
+
+        Raises an `IdempotencyInProgressException` if an unexpired in
+        progress record exists.
+        """
+        found, result = self.local_cache.get(key)
+        if found:
+            return True, result
+
+        from botocore.exceptions import ClientError
+
+        now = time.time()
+        try:
+            self.table.put_item(
+                Item={
+                    'PK': f'IDEMPOTENCY#{key}',
+                    'SK': 'RESULT',
+                    'status': IN_PROGRESS,
+                    'expires_at': int(now + in_progress_ttl),
+                },
+                ConditionExpression='attribute_not_exists(PK) OR expires_at < :now',
+                ExpressionAttributeValues={':now': int(now)},
+            )
+            return False, None
+        except ClientError as err:
+            if err.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+
+        item: Optional[Dict[str, Any]] = self.table.get_item(
+            Key={'PK': f'IDEMPOTENCY#{key}', 'SK': 'RESULT'}, ConsistentRead=True
+        ).get('Item')
+        if item and item['status'] == COMPLETED:
+            result = json_utils.loads(item['result'])
+            self.local_cache.put(key, result, float(item['expires_at']))
+            return True, result
+        raise IdempotencyInProgressException(f'Event already in progress: {key}')
+
+    def complete(self, key: str, result: Any, ttl: float) -> None:
+        """
+        Store the result for `key`, replacing the in progress record.
+
+        Raises a `TypeError`, before anything is stored, if the result isn't
+        JSON serializable.
+        """
+        try:
+            serialized_result = json_utils.dumps(result)
+        except TypeError as err:
+            raise TypeError(f'Result of {key} is not JSON serializable: {err}') from err
+        expires_at = time.time() + ttl
+        item: Dict[str, Any] = {
+            'PK': f'IDEMPOTENCY#{key}',
+            'SK': 'RESULT',
+            'status': COMPLETED,
+            'result': serialized_result,
+            'expires_at': int(expires_at),
+        }
+        self.table.put_item(Item=item)
+        self.local_cache.put(key, result, expires_at)
+
+    def release(self, key: str) -> None:
+        """
+        Delete the in progress record for `key`, eg if handling the event
+        failed, so the event can be retried.
+        """
+        self.delete_item(f'IDEMPOTENCY#{key}', 'RESULT')
@@ -1,5 +1,8 @@
 import json
-from typing import Any, Dict
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List, Tuple
 
 
 def load_sns_message_from_sqs(msg: Any) -> Any:
@@ -7,9 +10,63 @@ def load_sns_message_from_sqs(msg: Any) -> Any:
 
 
 def create_sqs_event(message: Dict[str, Any]) -> Dict[str, Any]:
-    body = json.dumps({'Message': json.dumps(message)})
+    body = json.dumps({'Type': 'Notification', 'Message': json.dumps(message)})
     return {
         'Records': [{
             'body': body,
         }],
     }
+
+
+def measure_import_time(module_name: str, runs: int = 1) -> Tuple[int, List[str]]:
+    """
+    Import a module in a fresh python interpreter using `python -X importtime`
+    and return the cumulative import time in microseconds along with the names
+    of all modules imported as a result.
+
+    The import is repeated in `runs` interpreters and the median time
+    returned, which is much less affected by a busy machine than a single
+    measurement.
+
+    Usage::
+
+        import_time, imported = measure_import_time('ppaya_lambda_utils.api_utils', runs=5)
+        assert import_time < 50_000
+        assert 'boto3' not in imported
+    """
+    import_times: List[int] = []
+    for run in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module_name}'],
+            capture_output=True, text=True, check=True)
+
+        import_time = 0
+        imported: List[str] = []
+        # Modules imported during interpreter start up are reported first,
+        # ending with the `site` module.
+        site_imported = False
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or line.endswith('| imported package'):
+                continue
+            __, cumulative, name = line.split('|')
+            if not site_imported:
+                site_imported = name.strip() == 'site'
+                continue
+            if not name.startswith('  '):
+                import_time += int(cumulative)
+            imported.append(name.strip())
+        import_times.append(import_time)
+    return int(statistics.median(import_times)), imported
+
+
+def get_imported_modules(module_name: str) -> List[str]:
+    """
+    Import a module in a fresh python interpreter and return the names of
+    all modules in `sys.modules` afterwards.
+    """
+    result = subprocess.run(
+        [sys.executable, '-c',
+         f'import json, sys, {module_name}; print(json.dumps(sorted(sys.modules)))'],
+        capture_output=True, text=True, check=True)
+    modules: List[str] = json.loads(result.stdout)
+    return modules
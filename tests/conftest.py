@@ -3,9 +3,11 @@ import json
 from aws_lambda_powertools import Logger
 import boto3
 from moto import (
-    mock_ssm, mock_kms, mock_sns, mock_sqs, mock_dynamodb)
+    mock_ssm, mock_kms, mock_sns, mock_sqs, mock_dynamodb, mock_secretsmanager)
 import pytest
 
+from ppaya_lambda_utils import deadline_utils
+
 
 @pytest.fixture
 def powertools_logger(scope='session'):
@@ -40,6 +42,12 @@ def ssm_test(ssm, kms_key):
         KeyId=kms_key['KeyMetadata']['KeyId'])
 
 
+@pytest.fixture(scope='module')
+def secretsmanager():
+    with mock_secretsmanager():
+        yield boto3.client('secretsmanager')
+
+
 @pytest.fixture(scope='module')
 def sns():
     with mock_sns():
@@ -113,3 +121,9 @@ def dynamodb_table(dynamodb):
     table.meta.client.get_waiter('table_exists').wait(
         TableName='test-table')
     yield table
+
+
+@pytest.fixture
+def set_deadline():
+    yield deadline_utils.set_deadline
+    deadline_utils.set_deadline(None)
@@ -3,6 +3,9 @@ from typing import Any, Dict, Optional, TYPE_CHECKING
 
 import pytest
 
+from ppaya_lambda_utils.boto_utils import boto_clients
+from ppaya_lambda_utils.exceptions import DeadlineExceededException
+from ppaya_lambda_utils.stores import dynamodb
 from ppaya_lambda_utils.stores.dynamodb import DynamoDBStore, paginated_results
 from ppaya_lambda_utils.stores.exceptions import ItemNotFoundException
 
@@ -30,6 +33,12 @@ class MyTestStore(DynamoDBStore):
 my_test_store = MyTestStore()
 
 
+def test_dynamodb_uses_prewarmed_resource(dynamodb) -> None:
+    boto_clients.prewarm(resources=['dynamodb'])
+
+    assert MyTestStore().dynamodb is boto_clients.get_resource('dynamodb')
+
+
 def test_get_item(dynamodb_table) -> None:
     item = {'PK': '1', 'SK': '1', 'other': '3'}
     my_test_store.put_item(item)
@@ -80,3 +89,43 @@ def test_paginated_results(dynamodb_table) -> None:
         fetch_count += 1
 
     assert fetch_count == expected_count
+
+
+def test_paginated_results_with_deadline(dynamodb_table, mocker) -> None:
+    with my_test_store.get_batch_writer() as batch:
+        for i in range(25):
+            my_test_store.put_item({'PK': 'X', 'SK': str(i)}, batch)
+
+    paginate_config: Dict[str, Any] = {
+        'TableName': my_test_store.table_name,
+        'PaginationConfig': {'PageSize': 10},
+    }
+    # Time for the first page only.
+    mocker.patch.object(dynamodb, 'has_time_remaining', side_effect=[True, False])
+    items = []
+    with pytest.raises(DeadlineExceededException) as exc_info:
+        for item in paginated_results('scan', paginate_config):
+            items.append(item)
+
+    assert len(items) == 10
+    assert exc_info.value.resume_token == {'PK': {'S': 'X'}, 'SK': {'S': items[-1]['SK']}}
+
+    mocker.patch.object(dynamodb, 'has_time_remaining', return_value=True)
+    paginate_config['ExclusiveStartKey'] = exc_info.value.resume_token
+    items.extend(paginated_results('scan', paginate_config))
+
+    assert sorted(int(item['SK']) for item in items) == list(range(25))
+
+
+def test_paginated_results_with_no_time(dynamodb_table, mocker) -> None:
+    mocker.patch.object(dynamodb, 'has_time_remaining', return_value=False)
+    start_key = {'PK': {'S': 'X'}, 'SK': {'S': '1'}}
+    paginate_config: Dict[str, Any] = {
+        'TableName': my_test_store.table_name,
+        'ExclusiveStartKey': start_key,
+    }
+
+    with pytest.raises(DeadlineExceededException) as exc_info:
+        list(paginated_results('scan', paginate_config))
+
+    assert exc_info.value.resume_token == start_key
@@ -0,0 +1,71 @@
+import time
+from unittest.mock import patch
+
+import pytest
+
+from ppaya_lambda_utils.stores.exceptions import IdempotencyInProgressException
+from ppaya_lambda_utils.stores.idempotency import (
+    get_event_fingerprint, IdempotencyStore, ResultCache)
+
+
+class MyIdempotencyStore(IdempotencyStore):
+    table_name = 'test-table'
+
+
+def test_get_event_fingerprint() -> None:
+    fingerprint = get_event_fingerprint({'a': 1, 'b': [1, 2]})
+
+    assert fingerprint == get_event_fingerprint({'b': [1, 2], 'a': 1})
+    assert fingerprint != get_event_fingerprint({'a': 2, 'b': [1, 2]})
+
+
+def test_get_event_fingerprint_jmespath() -> None:
+    fingerprint = get_event_fingerprint({'id': 1, 'time': 1}, 'id')
+
+    assert fingerprint == get_event_fingerprint({'id': 1, 'time': 2}, 'id')
+    assert fingerprint != get_event_fingerprint({'id': 2, 'time': 1}, 'id')
+
+
+def test_result_cache() -> None:
+    cache = ResultCache(max_size=2)
+    cache.put('a', 1, time.time() + 60)
+    cache.put('b', 2, time.time() + 60)
+    cache.get('a')
+    cache.put('c', 3, time.time() - 1)
+
+    assert cache.get('a') == (True, 1)
+    # Least recently used.
+    assert cache.get('b') == (False, None)
+    # Expired.
+    assert cache.get('c') == (False, None)
+
+
+def test_idempotency_store(dynamodb_table) -> None:
+    store = MyIdempotencyStore()
+
+    assert store.start('key', 60) == (False, None)
+    with pytest.raises(IdempotencyInProgressException):
+        store.start('key', 60)
+
+    store.complete('key', {'result': 'OK'}, 60)
+
+    assert store.start('key', 60) == (True, {'result': 'OK'})
+    # Found in the table by another container.
+    assert MyIdempotencyStore().start('key', 60) == (True, {'result': 'OK'})
+
+
+def test_idempotency_store_release(dynamodb_table) -> None:
+    store = MyIdempotencyStore()
+    store.start('key', 60)
+
+    store.release('key')
+
+    assert store.start('key', 60) == (False, None)
+
+
+def test_idempotency_store_in_progress_expired(dynamodb_table) -> None:
+    store = MyIdempotencyStore()
+    store.start('key', 60)
+
+    with patch('time.time', return_value=time.time() + 120):
+        assert store.start('key', 60) == (False, None)
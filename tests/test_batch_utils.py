@@ -0,0 +1,173 @@
+from typing import Any, Dict, List
+
+from botocore.exceptions import ClientError, EndpointConnectionError
+import pytest
+
+from ppaya_lambda_utils.batch_utils import (
+    exception_to_failure, get_backoff_delay, get_entry_size, pack_batches,
+    send_in_batches)
+from ppaya_lambda_utils.exceptions import BatchEntryTooLargeException
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(mocker):
+    yield mocker.patch('ppaya_lambda_utils.batch_utils.time.sleep')
+
+
+def make_entries(count: int) -> List[Dict[str, Any]]:
+    return [{'Id': str(x), 'MessageBody': str(x)} for x in range(count)]
+
+
+def make_sized_entries(sizes: List[int]) -> List[Dict[str, Any]]:
+    return [{'Id': str(x), 'MessageBody': 'x' * size} for x, size in enumerate(sizes)]
+
+
+def batch_ids(batches) -> List[List[str]]:
+    return [[entry['Id'] for entry in batch] for batch in batches]
+
+
+def test_send_in_batches() -> None:
+    batches = []
+
+    def send_batch(batch):
+        batches.append(batch)
+        return {'Successful': [
+            {'Id': entry['Id'], 'MessageId': f'msg-{entry["Id"]}'} for entry in batch]}
+
+    result = send_in_batches(send_batch, make_entries(25), max_batch_size=10)
+
+    assert sorted(len(batch) for batch in batches) == [5, 10, 10]
+    assert result.message_ids == {str(x): f'msg-{x}' for x in range(25)}
+    assert result.failed == []
+    assert result.attempts == {str(x): 1 for x in range(25)}
+
+
+def test_send_in_batches_retries_failed_entries(no_sleep) -> None:
+    sent: Dict[str, int] = {}
+
+    def send_batch(batch):
+        successful, failed = [], []
+        for entry in batch:
+            sent[entry['Id']] = sent.get(entry['Id'], 0) + 1
+            if entry['Id'] == '1' and sent['1'] < 3:
+                failed.append({
+                    'Id': '1', 'SenderFault': False, 'Code': 'InternalError',
+                    'Message': 'Oops'})
+            elif entry['Id'] == '2':
+                failed.append({
+                    'Id': '2', 'SenderFault': True, 'Code': 'InvalidParameterValue',
+                    'Message': 'Bad'})
+            else:
+                successful.append({'Id': entry['Id'], 'MessageId': entry['Id']})
+        return {'Successful': successful, 'Failed': failed}
+
+    result = send_in_batches(send_batch, make_entries(3), max_attempts=3)
+
+    assert result.message_ids == {'0': '0', '1': '1'}
+    assert result.attempts == {'0': 1, '1': 3, '2': 1}
+    assert len(result.failed) == 1
+    assert result.failed[0]['Code'] == 'InvalidParameterValue'
+    assert result.failed[0]['Entry'] == {'Id': '2', 'MessageBody': '2'}
+    assert no_sleep.call_count == 2
+
+
+def test_send_in_batches_with_exception() -> None:
+    def send_batch(batch):
+        raise ClientError(
+            {'Error': {'Code': 'ThrottlingException', 'Type': 'Sender'}},
+            'SendMessageBatch')
+
+    result = send_in_batches(send_batch, make_entries(2), max_attempts=2)
+
+    assert result.message_ids == {}
+    assert result.attempts == {'0': 2, '1': 2}
+    assert [failure['Code'] for failure in result.failed] == [
+        'ThrottlingException', 'ThrottlingException']
+
+
+def test_send_in_batches_with_duplicate_ids() -> None:
+    with pytest.raises(ValueError):
+        send_in_batches(lambda batch: {}, make_entries(2) + make_entries(1))
+
+
+def test_send_in_batches_with_entry_too_large() -> None:
+    def send_batch(batch):
+        raise AssertionError('Nothing should be sent')
+
+    with pytest.raises(BatchEntryTooLargeException):
+        send_in_batches(send_batch, make_sized_entries([10, 300]), max_batch_bytes=100)
+
+
+def test_send_in_batches_reporting_entry_too_large() -> None:
+    def send_batch(batch):
+        return {'Successful': [{'Id': entry['Id'], 'MessageId': entry['Id']} for entry in batch]}
+
+    result = send_in_batches(
+        send_batch, make_sized_entries([10, 300, 20]), max_batch_bytes=100,
+        raise_too_large=False)
+
+    assert result.message_ids == {'0': '0', '2': '2'}
+    assert result.attempts == {'0': 1, '2': 1}
+    assert len(result.failed) == 1
+    assert result.failed[0]['Id'] == '1'
+    assert result.failed[0]['Code'] == 'BatchEntryTooLargeException'
+    assert result.failed[0]['SenderFault'] is True
+    assert result.failed[0]['Entry']['MessageBody'] == 'x' * 300
+
+
+def test_pack_batches_by_count() -> None:
+    assert batch_ids(pack_batches(make_entries(5), max_batch_size=2)) == [
+        ['0', '1'], ['2', '3'], ['4']]
+
+
+def test_pack_batches_preserving_order() -> None:
+    entries = make_sized_entries([60, 50, 40, 30, 10, 10])
+
+    assert batch_ids(pack_batches(entries, max_batch_bytes=100)) == [
+        ['0'], ['1', '2'], ['3', '4', '5']]
+
+
+def test_pack_batches_without_preserving_order() -> None:
+    entries = make_sized_entries([60, 50, 40, 30, 10, 10])
+    batches = pack_batches(entries, max_batch_bytes=100, preserve_order=False)
+
+    assert batch_ids(batches) == [['0', '2'], ['1', '3', '4', '5']]
+
+
+def test_pack_batches_without_preserving_order_by_count() -> None:
+    entries = make_sized_entries([1] * 25)
+    batches = pack_batches(entries, max_batch_size=10, preserve_order=False)
+
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+
+
+def test_pack_batches_with_entry_too_large() -> None:
+    with pytest.raises(BatchEntryTooLargeException) as err_info:
+        pack_batches(make_sized_entries([10, 101, 10]), max_batch_bytes=100)
+    assert "('1', 101)" in str(err_info.value)
+
+
+def test_get_entry_size() -> None:
+    entry = {
+        'Id': '1',
+        'MessageBody': '£1',
+        'MessageAttributes': {
+            'type': {'DataType': 'String', 'StringValue': 'abc'},
+            'data': {'DataType': 'Binary', 'BinaryValue': b'1234'},
+        },
+    }
+    assert get_entry_size(entry) == 3 + (4 + 6 + 3) + (4 + 6 + 4)
+
+
+def test_exception_to_failure() -> None:
+    failure = exception_to_failure('1', EndpointConnectionError(endpoint_url='x'))
+    assert failure['SenderFault'] is False
+
+    failure = exception_to_failure('1', ValueError('Oops'))
+    assert failure == {
+        'Id': '1', 'SenderFault': True, 'Code': 'ValueError', 'Message': 'Oops'}
+
+
+def test_get_backoff_delay() -> None:
+    assert 0 <= get_backoff_delay(1, 0.1, 5) <= 0.1
+    assert 0 <= get_backoff_delay(10, 0.1, 5) <= 5
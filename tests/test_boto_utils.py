@@ -1,19 +1,27 @@
 from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import io
 import json
-from typing import List, TYPE_CHECKING
+import threading
+from typing import Any, Dict, List, Set, TYPE_CHECKING
 from unittest.mock import Mock
 
+from botocore.config import Config
 
-from ppaya_lambda_utils.exceptions import InvokeLambdaFunctionException, WorkflowException
+from ppaya_lambda_utils.exceptions import (
+    BatchEntryTooLargeException, DeadlineExceededException, InvokeLambdaFunctionException,
+    WorkflowException)
 from ppaya_lambda_utils.testing_utils import load_sns_message_from_sqs
 
 import pytest
 
+from ppaya_lambda_utils import boto_utils
 from ppaya_lambda_utils.boto_utils import (
     invoke_lambda_function, send_to_sqs, boto_clients, publish_to_sns,
-    start_sync_workflow)
+    start_sync_workflow, config_fingerprint, send_to_sqs_concurrently,
+    publish_batch_to_sns, invoke_lambda_functions, start_sync_workflows, open_connection)
 
 if TYPE_CHECKING:
     from mypy_boto3_sqs.type_defs import SendMessageBatchRequestEntryTypeDef
@@ -33,6 +41,132 @@ def test_get_resource(powertools_logger, sqs_queue) -> None:
     assert resource_1 is resource_2
 
 
+def test_get_client_with_different_config(sns) -> None:
+    client_1 = boto_clients.get_client('sns')
+    client_2 = boto_clients.get_client(
+        'sns', config=Config(retries={'max_attempts': 3, 'mode': 'adaptive'}))
+    client_3 = boto_clients.get_client(
+        'sns', config=Config(retries={'mode': 'adaptive', 'max_attempts': 3}))
+
+    assert client_1 is not client_2
+    assert client_2 is client_3
+
+
+def test_get_client_with_region_name(sns) -> None:
+    client_1 = boto_clients.get_client('sns', region_name='eu-west-1')
+    client_2 = boto_clients.get_client('sns', region_name='us-east-1')
+
+    assert client_1.meta.region_name == 'eu-west-1'
+    assert client_2.meta.region_name == 'us-east-1'
+
+
+def test_get_client_with_max_pool_connections(sqs) -> None:
+    client = boto_clients.get_client('sqs', max_pool_connections=50)
+
+    assert client.meta.config.max_pool_connections == 50
+    assert client is boto_clients.get_client('sqs', max_pool_connections=50)
+
+
+def test_get_client_from_threads(mocker) -> None:
+    create_client = mocker.patch(
+        'boto3.session.Session.client', side_effect=lambda *args, **kwargs: Mock())
+    config = Config(connect_timeout=7)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        clients = list(executor.map(
+            lambda _: boto_clients.get_client('kinesis', config=config), range(32)))
+
+    assert create_client.call_count == 1
+    assert all(client is clients[0] for client in clients)
+
+
+def test_prewarm(sns, sqs) -> None:
+    durations = boto_clients.prewarm(['sns', 'sqs'], resources=['sqs'])
+
+    assert set(durations) == {'client:sns', 'client:sqs', 'resource:sqs'}
+    assert all(duration >= 0 for duration in durations.values())
+    assert boto_clients.get_client('sns') is boto_clients.get_client('sns')
+
+
+def test_prewarm_with_connect(mocker, sns) -> None:
+    open_connection = mocker.patch('ppaya_lambda_utils.boto_utils.open_connection')
+
+    boto_clients.prewarm(['sns'], connect=True)
+
+    open_connection.assert_called_once_with(boto_clients.get_client('sns'))
+
+
+@pytest.fixture
+def http_endpoint():
+    """
+    A local HTTP/1.1 endpoint, yielding its url and the client addresses of
+    the connections made to it.
+    """
+    connections: Set[Any] = set()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_HEAD(self) -> None:
+            connections.add(self.client_address)
+            self.send_response(200)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}', connections
+    server.shutdown()
+    server.server_close()
+
+
+def test_open_connection(http_endpoint) -> None:
+    import boto3
+
+    url, connections = http_endpoint
+    client: Any = boto3.client('sns', endpoint_url=url)
+
+    open_connection(client)
+    open_connection(client)
+
+    # The connection was returned to the pool and re-used.
+    assert len(connections) == 1
+    pool = client._endpoint.http_session._manager.connection_from_url(url)
+    assert pool.num_connections == 1
+    assert pool.pool.qsize() == pool.pool.maxsize
+
+
+def test_prewarm_with_failure(mocker) -> None:
+    mocker.patch.object(boto_clients, 'get_client', side_effect=ValueError('Oops'))
+
+    assert boto_clients.prewarm(['sns']) == {}
+
+
+def test_config_fingerprint() -> None:
+    assert config_fingerprint(None) == ''
+    assert config_fingerprint(Config(read_timeout=5)) == config_fingerprint(
+        Config(read_timeout=5))
+    assert config_fingerprint(Config(read_timeout=5)) != config_fingerprint(
+        Config(read_timeout=6))
+
+
+def test_get_client_cache_hit_reuses_config(sns, mocker) -> None:
+    config = Config(read_timeout=30)
+    client = boto_clients.get_client(
+        'sns', config=config, max_pool_connections=20, max_timeout=4)
+    fingerprint = mocker.patch('ppaya_lambda_utils.boto_utils.config_fingerprint')
+
+    assert boto_clients.get_client(
+        'sns', config=config, max_pool_connections=20, max_timeout=4) is client
+    assert client.meta.config.max_pool_connections == 20
+    assert client.meta.config.read_timeout == 4
+    fingerprint.assert_not_called()
+
+
 def test_send_to_sqs(sqs_queue) -> None:
     entries: List[SendMessageBatchRequestEntryTypeDef] = [
         {'Id': str(x), 'MessageBody': str(x)} for x in range(22)]
@@ -49,6 +183,81 @@ def test_send_to_sqs(sqs_queue) -> None:
     assert len(sqs_queue.receive_messages()) == 0
 
 
+def test_send_to_sqs_with_deadline(sqs_queue, mocker, set_deadline) -> None:
+    entries: List[SendMessageBatchRequestEntryTypeDef] = [
+        {'Id': str(x), 'MessageBody': str(x)} for x in range(22)]
+    sqs = boto_clients.get_resource('sqs')
+    # Time for the first batch only.
+    mocker.patch.object(
+        boto_utils, 'has_time_remaining', side_effect=[True, False, False])
+
+    with pytest.raises(DeadlineExceededException) as exc_info:
+        send_to_sqs(sqs, sqs_queue.url, entries)
+
+    assert len(exc_info.value.partial_result) == 10
+    assert exc_info.value.resume_token == entries[10:]
+
+
+def test_send_to_sqs_by_size(sqs_queue, mocker) -> None:
+    entries: List[SendMessageBatchRequestEntryTypeDef] = [
+        {'Id': str(x), 'MessageBody': str(x) * 100_000} for x in range(5)]
+    sqs = boto_clients.get_resource('sqs')
+    pack_batches = mocker.spy(boto_utils, 'pack_batches')
+    resp = send_to_sqs(sqs, sqs_queue.url, entries)
+
+    assert len(resp) == 5
+    assert [len(batch) for batch in pack_batches.spy_return] == [2, 2, 1]
+
+
+def test_send_to_sqs_with_entry_too_large(sqs_queue) -> None:
+    entries: List[SendMessageBatchRequestEntryTypeDef] = [
+        {'Id': '1', 'MessageBody': 'x' * 300_000}]
+    sqs = boto_clients.get_resource('sqs')
+
+    with pytest.raises(BatchEntryTooLargeException):
+        send_to_sqs(sqs, sqs_queue.url, entries)
+
+
+def test_send_to_sqs_concurrently(sqs_queue) -> None:
+    entries: List[SendMessageBatchRequestEntryTypeDef] = [
+        {'Id': str(x), 'MessageBody': str(x)} for x in range(45)]
+    sqs = boto_clients.get_resource('sqs')
+    result = send_to_sqs_concurrently(sqs, sqs_queue.url, entries, max_workers=4)
+
+    assert len(result.message_ids) == 45
+    assert result.failed == []
+    assert set(result.attempts.values()) == {1}
+
+    bodies: Set[str] = set()
+    while messages := sqs_queue.receive_messages(MaxNumberOfMessages=10):
+        bodies.update(message.body for message in messages)
+    assert bodies == {str(x) for x in range(45)}
+
+
+def test_send_to_sqs_concurrently_with_failure(mocker) -> None:
+    mocker.patch('ppaya_lambda_utils.batch_utils.time.sleep')
+    resource = Mock()
+    resource.meta.client.send_message_batch.side_effect = [
+        {
+            'Successful': [{'Id': '0', 'MessageId': 'a'}],
+            'Failed': [{'Id': '1', 'SenderFault': False, 'Code': 'InternalError'}],
+        },
+        {
+            'Failed': [{'Id': '1', 'SenderFault': False, 'Code': 'InternalError'}],
+        },
+    ]
+    entries: List[SendMessageBatchRequestEntryTypeDef] = [
+        {'Id': str(x), 'MessageBody': str(x)} for x in range(2)]
+
+    result = send_to_sqs_concurrently(resource, 'queue-url', entries, max_attempts=2)
+
+    assert result.message_ids == {'0': 'a'}
+    assert result.attempts == {'0': 1, '1': 2}
+    assert result.failed == [{
+        'Id': '1', 'SenderFault': False, 'Code': 'InternalError',
+        'Entry': {'Id': '1', 'MessageBody': '1'}}]
+
+
 def test_publish_to_sns(sns_topic, sns_subscription) -> None:
     sns = boto_clients.get_client('sns')
     message_in = {'x': 'y', 'my_decimal': Decimal('2.6')}
@@ -69,6 +278,49 @@ def test_publish_to_sns_without_attributes(sns_topic, sns_subscription) -> None:
     assert message == message
 
 
+def test_publish_batch_to_sns(sns_topic, sns_subscription) -> None:
+    sns = boto_clients.get_client('sns')
+    messages = [{'x': x, 'my_decimal': Decimal('2.6')} for x in range(25)]
+    message_attributes = {
+        'message_type': {'DataType': 'String', 'StringValue': 'test'}}
+    result = publish_batch_to_sns(sns, sns_topic.arn, messages, message_attributes)
+
+    assert set(result.message_ids) == {str(x) for x in range(25)}
+    assert result.failed == []
+
+    messages_out: List[Dict[str, Any]] = []
+    while received := sns_subscription.receive_messages(
+            MaxNumberOfMessages=10, MessageAttributeNames=['All']):
+        messages_out.extend(load_sns_message_from_sqs(x) for x in received)
+    assert sorted(messages_out, key=lambda x: x['x']) == [
+        {'x': x, 'my_decimal': '2.6'} for x in range(25)]
+
+
+def test_publish_batch_to_sns_with_failure(mocker) -> None:
+    mocker.patch('ppaya_lambda_utils.batch_utils.time.sleep')
+    sns = Mock()
+    sns.publish_batch.side_effect = [
+        {
+            'Successful': [{'Id': '0', 'MessageId': 'a'}],
+            'Failed': [{'Id': '1', 'SenderFault': False, 'Code': 'InternalError'}],
+        },
+        {
+            'Successful': [{'Id': '1', 'MessageId': 'b'}],
+        },
+    ]
+
+    result = publish_batch_to_sns(sns, 'topic-arn', [{'x': 0}, {'x': 1}])
+
+    assert result.message_ids == {'0': 'a', '1': 'b'}
+    assert result.attempts == {'0': 1, '1': 2}
+    assert sns.publish_batch.call_args.kwargs['PublishBatchRequestEntries'] == [{
+        'Id': '1',
+        'Message': '{"default":"{\\"x\\":1}"}',
+        'MessageStructure': 'json',
+        'MessageAttributes': {},
+    }]
+
+
 def test_invoke_lambda_function_with_event_invocation_type(mocker):
     mock_lambda_client = Mock()
     mock_lambda_client().invoke.return_value = {'StatusCode': 202}
@@ -77,6 +329,26 @@ def test_invoke_lambda_function_with_event_invocation_type(mocker):
     invoke_lambda_function('test_func', {'msg': 'blah'})
 
 
+def test_invoke_lambda_function_with_deadline(mocker, set_deadline):
+    mock_lambda_client = Mock()
+    mocker.patch.object(boto_clients, 'get_client', mock_lambda_client)
+    set_deadline(500)
+
+    with pytest.raises(DeadlineExceededException):
+        invoke_lambda_function('test_func', {'msg': 'blah'})
+
+    mock_lambda_client.assert_not_called()
+
+
+def test_get_client_with_max_timeout(sqs) -> None:
+    client = boto_clients.get_client('sqs', max_timeout=4)
+
+    assert client.meta.config.read_timeout == 4
+    assert client.meta.config.connect_timeout == 4
+    assert boto_clients.get_client('sqs', max_timeout=4) is client
+    assert boto_clients.get_client('sqs', max_timeout=120) is boto_clients.get_client('sqs')
+
+
 def test_invoke_lambda_function_with_error(mocker):
     mock_lambda_client = Mock()
     mock_lambda_client().invoke.return_value = {'StatusCode': 400}
@@ -99,6 +371,97 @@ def test_invoke_lambda_function_with_request_response_invocation_type(mocker):
     assert resp == {'x': 1}
 
 
+@pytest.mark.parametrize('response_format, expected', [
+    ('json', [{'x': 1}, {'x': 2}]),
+    ('bytes', b'[{"x": 1}, {"x": 2}]'),
+])
+def test_invoke_lambda_function_with_response_format(mocker, response_format, expected):
+    mock_lambda_client = Mock()
+    mock_lambda_client().invoke.return_value = {
+        'StatusCode': 200,
+        'Payload': io.BytesIO(b'[{"x": 1}, {"x": 2}]'),
+    }
+    mocker.patch.object(boto_clients, 'get_client', mock_lambda_client)
+
+    resp = invoke_lambda_function(
+        'test_func', {'msg': 'blah'}, 'RequestResponse', response_format)
+
+    assert resp == expected
+
+
+def test_invoke_lambda_function_with_stream_response_format(mocker):
+    payload_stream = io.BytesIO(b'[{"x": 1}, {"x": 2}]')
+    mock_lambda_client = Mock()
+    mock_lambda_client().invoke.return_value = {'StatusCode': 200, 'Payload': payload_stream}
+    mocker.patch.object(boto_clients, 'get_client', mock_lambda_client)
+
+    resp = invoke_lambda_function('test_func', {'msg': 'blah'}, 'RequestResponse', 'stream')
+
+    assert resp is payload_stream
+    assert resp.tell() == 0
+
+
+def test_invoke_lambda_function_with_items_response_format(mocker):
+    payload_stream = io.BytesIO(json.dumps([{'x': x} for x in range(20_000)]).encode('utf-8'))
+    mock_lambda_client = Mock()
+    mock_lambda_client().invoke.return_value = {'StatusCode': 200, 'Payload': payload_stream}
+    mocker.patch.object(boto_clients, 'get_client', mock_lambda_client)
+
+    items = invoke_lambda_function('test_func', {'msg': 'blah'}, 'RequestResponse', 'items')
+
+    assert next(items) == {'x': 0}
+    assert payload_stream.tell() < len(payload_stream.getvalue())
+    assert list(items) == [{'x': x} for x in range(1, 20_000)]
+
+
+def test_invoke_lambda_function_with_function_error(mocker):
+    mock_lambda_client = Mock()
+    mock_lambda_client().invoke.return_value = {
+        'StatusCode': 200,
+        'FunctionError': 'Unhandled',
+        'Payload': io.BytesIO(b'{"errorMessage": "Oops"}'),
+    }
+    mocker.patch.object(boto_clients, 'get_client', mock_lambda_client)
+
+    with pytest.raises(InvokeLambdaFunctionException):
+        invoke_lambda_function('test_func', {'msg': 'blah'}, 'RequestResponse', 'stream')
+
+
+def test_invoke_lambda_functions(mocker):
+    def invoke(FunctionName, InvocationType, Payload):
+        payload = json.loads(Payload)
+        if payload['x'] == 2:
+            return {'StatusCode': 200, 'FunctionError': 'Unhandled', 'Payload': io.BytesIO(b'{}')}
+        return {'StatusCode': 200, 'Payload': io.BytesIO(Payload)}
+
+    mock_lambda_client = Mock()
+    mock_lambda_client().invoke.side_effect = invoke
+    mocker.patch.object(boto_clients, 'get_client', mock_lambda_client)
+
+    results = invoke_lambda_functions(
+        [('test_func', {'x': x}) for x in range(5)], max_workers=3)
+
+    assert results[:2] == [{'x': 0}, {'x': 1}]
+    assert isinstance(results[2], InvokeLambdaFunctionException)
+    assert results[3:] == [{'x': 3}, {'x': 4}]
+
+
+def test_invoke_lambda_functions_with_deadline(mocker):
+    mock_lambda_client = Mock()
+    mock_lambda_client().invoke.return_value = {'StatusCode': 202}
+    mocker.patch.object(boto_clients, 'get_client', mock_lambda_client)
+    context = Mock()
+    context.get_remaining_time_in_millis.side_effect = [5000, 500]
+
+    results = invoke_lambda_functions(
+        [('test_func', {'x': 1}), ('test_func', {'x': 2})], 'Event', max_workers=1,
+        context=context, min_remaining_time_ms=1000)
+
+    assert results[0] is None
+    assert isinstance(results[1], DeadlineExceededException)
+    assert mock_lambda_client().invoke.call_count == 1
+
+
 def test_start_sync_workflow(mocker):
     mock_sfn_client = Mock()
     output = {'b': 2}
@@ -125,3 +488,41 @@ def test_start_sync_workflow_with_failure(mocker):
     with pytest.raises(WorkflowException) as err_info:
         start_sync_workflow({'a': 1}, 'state-machine-arn')
     assert str(err_info.value) == 'OopsError: Oops'
+
+
+def test_start_sync_workflows(mocker):
+    def start_sync_execution(stateMachineArn, input):
+        data = json.loads(input)
+        if data['a'] == 2:
+            return {
+                'status': 'FAILED',
+                'cause': json.dumps({'errorMessage': 'Oops', 'errorType': 'OopsError'}),
+            }
+        return {'status': 'SUCCEEDED', 'output': json.dumps({'b': data['a']})}
+
+    mock_sfn_client = Mock()
+    mock_sfn_client().start_sync_execution.side_effect = start_sync_execution
+    mocker.patch.object(boto_clients, 'get_client', mock_sfn_client)
+
+    results = start_sync_workflows(
+        [{'a': x} for x in range(4)], 'state-machine-arn', max_workers=2)
+
+    assert results[:2] == [{'b': 0}, {'b': 1}]
+    assert isinstance(results[2], WorkflowException)
+    assert str(results[2]) == 'OopsError: Oops'
+    assert results[3] == {'b': 3}
+
+
+def test_start_sync_workflows_with_deadline(mocker):
+    mock_sfn_client = Mock()
+    mock_sfn_client().start_sync_execution.return_value = {
+        'status': 'SUCCEEDED', 'output': '{}'}
+    mocker.patch.object(boto_clients, 'get_client', mock_sfn_client)
+    context = Mock()
+    context.get_remaining_time_in_millis.return_value = 500
+
+    results = start_sync_workflows(
+        [{'a': 1}], 'state-machine-arn', context=context, min_remaining_time_ms=1000)
+
+    assert isinstance(results[0], DeadlineExceededException)
+    mock_sfn_client().start_sync_execution.assert_not_called()
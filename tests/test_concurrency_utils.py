@@ -0,0 +1,44 @@
+import threading
+
+from ppaya_lambda_utils.concurrency_utils import map_concurrently
+from ppaya_lambda_utils.exceptions import DeadlineExceededException
+
+
+def test_map_concurrently() -> None:
+    thread_ids = set()
+
+    def square(x: int) -> int:
+        thread_ids.add(threading.get_ident())
+        return x * x
+
+    assert map_concurrently(square, list(range(20)), max_workers=4) == [
+        x * x for x in range(20)]
+    assert 1 <= len(thread_ids) <= 4
+
+
+def test_map_concurrently_with_exception() -> None:
+    def invert(x: int) -> float:
+        return 1 / x
+
+    results = map_concurrently(invert, [1, 0, 2])
+
+    assert results[0] == 1
+    assert isinstance(results[1], ZeroDivisionError)
+    assert results[2] == 0.5
+
+
+def test_map_concurrently_without_items() -> None:
+    assert map_concurrently(str, []) == []
+
+
+def test_map_concurrently_with_remaining_time() -> None:
+    remaining_times = iter([5000, 3000, 1000, 500])
+
+    results = map_concurrently(
+        str, [1, 2, 3, 4], max_workers=1,
+        get_remaining_time_ms=lambda: next(remaining_times),
+        min_remaining_time_ms=2000)
+
+    assert results[:2] == ['1', '2']
+    assert isinstance(results[2], DeadlineExceededException)
+    assert isinstance(results[3], DeadlineExceededException)
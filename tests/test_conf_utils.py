@@ -1,9 +1,15 @@
 from datetime import datetime
-from typing import List
+from decimal import Decimal
+from enum import Enum
+import json
+import threading
+from typing import Any, Dict, List, Optional
 
 from freezegun import freeze_time
+import pytest
 
 from ppaya_lambda_utils.conf_utils import BaseSettings
+from ppaya_lambda_utils.exceptions import SettingsException
 
 
 class MySettings(BaseSettings):
@@ -41,3 +47,294 @@ def test_environment_secrets(ssm_test) -> None:
 
     with freeze_time('2021-03-17 05:25:30'):
         assert settings._is_secret_load_required() is True
+
+
+@pytest.fixture
+def get_parameter(mocker):
+    yield mocker.patch('aws_lambda_powertools.utilities.parameters.get_parameter')
+
+
+def test_environment_secrets_loaded_on_access(get_parameter) -> None:
+    settings = MySettings()
+    get_parameter.return_value = {'SOME_PASSWORD': 'password-1'}
+
+    with freeze_time('2021-03-17 04:45:30'):
+        # Secrets aren't loaded until a secret field is read.
+        assert settings.ENV_NAME == 'local'
+        assert get_parameter.call_count == 0
+
+        assert settings.SOME_PASSWORD == 'password-1'
+        assert settings.SOME_PASSWORD == 'password-1'
+        assert get_parameter.call_count == 1
+
+    # The default value is returned from the class.
+    assert MySettings.SOME_PASSWORD == 'TBA'
+
+    get_parameter.return_value = {'SOME_PASSWORD': 'password-2'}
+    with freeze_time('2021-03-17 05:25:30'):
+        # Expired secrets are reloaded on access.
+        assert settings.SOME_PASSWORD == 'password-2'
+        assert get_parameter.call_count == 2
+
+
+def test_environment_secrets_not_loaded_on_access(get_parameter) -> None:
+    class ExplicitLoadSettings(MySettings):
+        SECRETS_LOAD_ON_ACCESS = False
+
+    settings = ExplicitLoadSettings()
+    assert settings.SOME_PASSWORD == 'TBA'
+    assert get_parameter.call_count == 0
+
+
+class BackgroundRefreshSettings(MySettings):
+    SECRETS_REFRESH_IN_BACKGROUND = True
+    SECRETS_MAX_AGE = 60
+    SECRETS_MAX_STALENESS = 60
+
+
+def test_environment_secrets_background_refresh(get_parameter) -> None:
+    settings = BackgroundRefreshSettings()
+    get_parameter.return_value = {'SOME_PASSWORD': 'password-1'}
+
+    with freeze_time('2021-03-17 04:45:30'):
+        # The first load blocks.
+        settings.load_secret_settings()
+        assert settings.SOME_PASSWORD == 'password-1'
+
+    refresh_started = threading.Event()
+    finish_refresh = threading.Event()
+
+    def get_new_parameter(*args, **kwargs):
+        refresh_started.set()
+        finish_refresh.wait(5)
+        return {'SOME_PASSWORD': 'password-2'}
+
+    get_parameter.side_effect = get_new_parameter
+
+    with freeze_time('2021-03-17 04:46:40'):
+        # Expired, the cached value is used while refreshing.
+        settings.load_secret_settings()
+        assert refresh_started.wait(5)
+        assert settings.SOME_PASSWORD == 'password-1'
+
+        # Only one refresh is started at a time.
+        settings.load_secret_settings()
+
+        finish_refresh.set()
+        assert settings._refresh_thread is not None
+        settings._refresh_thread.join(5)
+        assert settings.SOME_PASSWORD == 'password-2'
+        assert get_parameter.call_count == 2
+
+
+def test_environment_secrets_background_refresh_too_stale(get_parameter) -> None:
+    settings = BackgroundRefreshSettings()
+    get_parameter.return_value = {'SOME_PASSWORD': 'password-1'}
+
+    with freeze_time('2021-03-17 04:45:30'):
+        settings.load_secret_settings()
+
+    get_parameter.return_value = {'SOME_PASSWORD': 'password-2'}
+    with freeze_time('2021-03-17 04:47:40'):
+        settings.load_secret_settings()
+        assert settings.SOME_PASSWORD == 'password-2'
+        assert settings._refresh_thread is None
+
+
+class MultiSourceSettings(MySettings):
+    SECRETS_KEYS = ['/my-app/more-secrets']
+    SECRETS_PATHS = ['/my-app/by-path']
+    SECRETS_MANAGER_IDS = ['my-app-secret']
+
+    API_KEY: str = 'TBA'
+    DB_PASSWORD: str = 'TBA'
+    TOKEN: str = 'TBA'
+
+    secret_fields: List[str] = [
+        'SOME_PASSWORD',
+        'API_KEY',
+        'DB_PASSWORD',
+        'TOKEN',
+    ]
+
+
+def test_environment_secrets_multiple_sources(ssm, ssm_test, secretsmanager) -> None:
+    ssm.put_parameter(
+        Name='/my-app/more-secrets', Type='SecureString',
+        Value=json.dumps({'API_KEY': 'api-key', 'TOKEN': 'overridden'}))
+    ssm.put_parameter(
+        Name='/my-app/by-path/nested/DB_PASSWORD', Type='SecureString',
+        Value='db-password')
+    secretsmanager.create_secret(
+        Name='my-app-secret', SecretString=json.dumps({'TOKEN': 'token'}))
+
+    settings = MultiSourceSettings()
+    settings.load_secret_settings()
+
+    assert settings.SOME_PASSWORD == 'xxx-password-xxx'
+    assert settings.API_KEY == 'api-key'
+    assert settings.DB_PASSWORD == 'db-password'
+    assert settings.TOKEN == 'token'
+
+
+def test_environment_secrets_missing_parameter(ssm) -> None:
+    class MissingSettings(MultiSourceSettings):
+        SECRETS_KEYS = ['/my-app/missing']
+        SECRETS_PATHS = []
+        SECRETS_MANAGER_IDS = []
+
+    with pytest.raises(SettingsException, match='/my-app/missing'):
+        MissingSettings().load_secret_settings()
+
+
+def test_environment_secrets_jittered_expiry(get_parameter, mocker) -> None:
+    class JitteredSettings(MySettings):
+        SECRETS_MAX_AGE = 100
+        SECRETS_MAX_AGE_JITTER = 0.5
+
+    mocker.patch('ppaya_lambda_utils.conf_utils.random.uniform', return_value=0.3)
+    settings = JitteredSettings()
+    get_parameter.return_value = {'SOME_PASSWORD': 'password-1'}
+
+    with freeze_time('2021-03-17 04:45:30'):
+        settings.load_secret_settings()
+    with freeze_time('2021-03-17 04:46:39'):
+        assert settings._is_secret_load_required() is False
+    with freeze_time('2021-03-17 04:46:41'):
+        assert settings._is_secret_load_required() is True
+
+
+def test_environment_secrets_serve_stale_on_error(get_parameter, mocker) -> None:
+    mocker.patch('ppaya_lambda_utils.batch_utils.get_backoff_delay', return_value=10)
+    settings = MySettings()
+    get_parameter.return_value = {'SOME_PASSWORD': 'password-1'}
+
+    with freeze_time('2021-03-17 04:45:30'):
+        settings.load_secret_settings()
+
+    get_parameter.side_effect = Exception('ThrottlingException')
+    with freeze_time('2021-03-17 05:25:30'):
+        # The cached value is served when the refresh fails.
+        assert settings.SOME_PASSWORD == 'password-1'
+        assert get_parameter.call_count == 2
+        assert settings._refresh_failures == 1
+
+    with freeze_time('2021-03-17 05:25:35'):
+        # Refreshes are backed off.
+        assert settings.SOME_PASSWORD == 'password-1'
+        assert get_parameter.call_count == 2
+
+    get_parameter.side_effect = None
+    get_parameter.return_value = {'SOME_PASSWORD': 'password-2'}
+    with freeze_time('2021-03-17 05:25:41'):
+        assert settings.SOME_PASSWORD == 'password-2'
+        assert get_parameter.call_count == 3
+        assert settings._refresh_failures == 0
+
+
+def test_environment_secrets_error_without_cached_values(get_parameter) -> None:
+    settings = MySettings()
+    get_parameter.side_effect = Exception('ThrottlingException')
+
+    with pytest.raises(Exception, match='ThrottlingException'):
+        settings.load_secret_settings()
+
+
+class Colour(Enum):
+    RED = 'red'
+    BLUE = 'blue'
+
+
+class TypedSettings(BaseSettings):
+    __slots__ = ()
+
+    DEBUG: bool = True
+    COUNT: int = 1
+    RATE: float = 0.5
+    PRICE: Decimal = Decimal('1.00')
+    HOSTS: List[str] = []
+    PORTS: List[int] = []
+    OPTIONS: Dict[str, Any] = {}
+    COLOUR: Colour = Colour.RED
+    TIMEOUT: Optional[int] = None
+
+    environ_fields: List[str] = [
+        'DEBUG',
+        'COUNT',
+        'RATE',
+        'PRICE',
+        'HOSTS',
+        'PORTS',
+        'OPTIONS',
+        'COLOUR',
+        'TIMEOUT',
+    ]
+
+
+def test_typed_environment_variables(monkeypatch) -> None:
+    monkeypatch.setenv('DEBUG', 'false')
+    monkeypatch.setenv('COUNT', '3')
+    monkeypatch.setenv('RATE', '0.25')
+    monkeypatch.setenv('PRICE', '9.99')
+    monkeypatch.setenv('HOSTS', 'a.example.com, b.example.com')
+    monkeypatch.setenv('PORTS', '[80, 443]')
+    monkeypatch.setenv('OPTIONS', '{"retries": 2}')
+    monkeypatch.setenv('COLOUR', 'BLUE')
+    monkeypatch.setenv('TIMEOUT', '30')
+
+    settings = TypedSettings()
+
+    assert settings.DEBUG is False
+    assert settings.COUNT == 3
+    assert settings.RATE == 0.25
+    assert settings.PRICE == Decimal('9.99')
+    assert settings.HOSTS == ['a.example.com', 'b.example.com']
+    assert settings.PORTS == [80, 443]
+    assert settings.OPTIONS == {'retries': 2}
+    assert settings.COLOUR is Colour.BLUE
+    assert settings.TIMEOUT == 30
+    # Settings are stored in slots.
+    assert not hasattr(settings, '__dict__')
+
+
+def test_settings_without_slots(monkeypatch) -> None:
+    monkeypatch.setenv('ENV_NAME', 'prod')
+    monkeypatch.setenv('EXTRA', '{"a": 1}')
+
+    class ExtraSettings(BaseSettings):
+        SECRETS_LOADED_AT = None
+        EXTRA: Any = None
+        extra: str
+
+        environ_fields: List[str] = ['EXTRA']
+
+    class CombinedSettings(MySettings, ExtraSettings):
+        environ_fields = [*MySettings.environ_fields, *ExtraSettings.environ_fields]
+
+    settings = CombinedSettings()
+    settings.extra = 'value'
+
+    assert settings.ENV_NAME == 'prod'
+    # Values annotated with Any are left as they are.
+    assert settings.EXTRA == '{"a": 1}'
+    assert settings.extra == 'value'
+    assert settings.__dict__['ENV_NAME'] == 'prod'
+
+
+def test_typed_environment_variables_defaults() -> None:
+    class SubSettings(TypedSettings):
+        COUNT = 5
+
+    settings = SubSettings()
+    assert settings.DEBUG is True
+    assert settings.COUNT == 5
+    assert settings.TIMEOUT is None
+    assert SubSettings.COUNT == 5
+    assert TypedSettings.COUNT == 1
+
+
+def test_typed_environment_variables_invalid(monkeypatch) -> None:
+    monkeypatch.setenv('DEBUG', 'maybe')
+
+    with pytest.raises(SettingsException, match='DEBUG'):
+        TypedSettings()
@@ -0,0 +1,63 @@
+from unittest.mock import Mock
+
+import pytest
+
+from ppaya_lambda_utils import deadline_utils
+from ppaya_lambda_utils.concurrency_utils import map_concurrently
+from ppaya_lambda_utils.deadline_utils import (
+    check_deadline, deadline_scope, get_max_timeout, get_remaining_time_ms,
+    has_time_remaining)
+from ppaya_lambda_utils.exceptions import DeadlineExceededException
+
+
+def test_no_deadline() -> None:
+    assert get_remaining_time_ms() is None
+    assert has_time_remaining(10_000_000) is True
+    assert get_max_timeout() is None
+    check_deadline('Operation')
+
+
+def test_set_deadline(set_deadline) -> None:
+    set_deadline(5000)
+
+    remaining_time_ms = get_remaining_time_ms()
+    assert remaining_time_ms is not None and 4900 < remaining_time_ms <= 5000
+    assert has_time_remaining(1000) is True
+    assert has_time_remaining(6000) is False
+    check_deadline('Operation', 1000)
+    with pytest.raises(DeadlineExceededException, match='Operation not started'):
+        check_deadline('Operation', 6000)
+
+
+@pytest.mark.parametrize('remaining_time_ms, expected', [
+    (900_000, 512),
+    (60_000, 32),
+    (10_000, 8),
+    (2_500, 1),
+    (1_800, 0.5),
+    (1_000, None),
+    (0, None),
+])
+def test_get_max_timeout(set_deadline, remaining_time_ms, expected) -> None:
+    set_deadline(remaining_time_ms)
+
+    assert get_max_timeout() == expected
+
+
+def test_deadline_scope() -> None:
+    context = Mock()
+    context.get_remaining_time_in_millis.return_value = 3000
+
+    with deadline_scope(context):
+        remaining_time_ms = get_remaining_time_ms()
+        assert remaining_time_ms is not None and 2900 < remaining_time_ms <= 3000
+
+    assert deadline_utils._deadline is None
+
+
+def test_map_concurrently_uses_deadline(set_deadline) -> None:
+    set_deadline(500)
+
+    results = map_concurrently(lambda x: x, [1, 2], min_remaining_time_ms=1000)
+
+    assert all(isinstance(result, DeadlineExceededException) for result in results)
@@ -0,0 +1,59 @@
+import pytest
+
+from ppaya_lambda_utils.testing_utils import get_imported_modules, measure_import_time
+
+
+MODULES = [
+    'ppaya_lambda_utils.api_utils',
+    'ppaya_lambda_utils.boto_utils',
+    'ppaya_lambda_utils.conf_utils',
+    'ppaya_lambda_utils.logging_utils',
+    'ppaya_lambda_utils.middleware',
+    'ppaya_lambda_utils.notification_utils',
+    'ppaya_lambda_utils.stores.dynamodb',
+    'ppaya_lambda_utils.stores.idempotency',
+    'ppaya_lambda_utils.stores.inputs',
+    'ppaya_lambda_utils.stores.utils',
+]
+
+# Maximum median cumulative import time, in microseconds, for each module.
+# Budgets are around twice the medians measured when they were set, or more,
+# so they fail for regressions rather than for a busy machine.
+IMPORT_TIME_BUDGETS = {
+    'ppaya_lambda_utils.api_utils': 25_000,
+    'ppaya_lambda_utils.boto_utils': 75_000,
+    'ppaya_lambda_utils.conf_utils': 25_000,
+    'ppaya_lambda_utils.logging_utils': 25_000,
+    'ppaya_lambda_utils.middleware': 25_000,
+    'ppaya_lambda_utils.notification_utils': 75_000,
+    'ppaya_lambda_utils.stores.dynamodb': 75_000,
+    'ppaya_lambda_utils.stores.idempotency': 75_000,
+    'ppaya_lambda_utils.stores.inputs': 50_000,
+    'ppaya_lambda_utils.stores.utils': 50_000,
+}
+
+# Packages, and their sub-modules, which should only be imported on first use.
+LAZY_IMPORTS = [
+    'aws_lambda_powertools',
+    'boto3',
+    'botocore',
+    'jmespath',
+    'zoneinfo',
+]
+
+
+@pytest.mark.parametrize('module_name', MODULES)
+def test_lazy_imports(module_name) -> None:
+    imported = get_imported_modules(module_name)
+
+    assert [
+        name for name in imported
+        if any(name == lazy or name.startswith(f'{lazy}.') for lazy in LAZY_IMPORTS)
+    ] == []
+
+
+@pytest.mark.parametrize('module_name, budget', IMPORT_TIME_BUDGETS.items())
+def test_import_time(module_name, budget) -> None:
+    import_time, __ = measure_import_time(module_name, runs=5)
+
+    assert import_time < budget
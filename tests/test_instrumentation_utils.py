@@ -0,0 +1,111 @@
+from unittest.mock import Mock
+
+import boto3
+from botocore.awsrequest import AWSResponse
+import pytest
+
+from ppaya_lambda_utils.boto_utils import boto_clients
+from ppaya_lambda_utils.instrumentation_utils import (
+    add_aws_call_metrics, aws_call_stats, AwsCallStats, instrument_client, OperationStats)
+
+
+def test_instrument_client(ssm) -> None:
+    stats = AwsCallStats()
+    client = boto3.client('ssm')
+    instrument_client(client, stats)
+
+    client.put_parameter(Name='/instrumented', Value='value', Type='String')
+    client.get_parameter(Name='/instrumented')
+    with pytest.raises(client.exceptions.ParameterNotFound):
+        client.get_parameter(Name='/missing')
+
+    collected = stats.reset()
+    assert set(collected) == {('ssm', 'PutParameter'), ('ssm', 'GetParameter')}
+    get_parameter = collected[('ssm', 'GetParameter')]
+    assert get_parameter.calls == 2
+    assert get_parameter.errors == 1
+    assert get_parameter.throttles == 0
+    assert get_parameter.total_ms >= get_parameter.max_ms > 0
+    assert get_parameter.request_bytes > 0
+    assert stats.reset() == {}
+
+
+def test_instrument_client_counts_throttled_attempts(mocker, ssm) -> None:
+    stats = AwsCallStats()
+    client = boto3.client('ssm')
+    instrument_client(client, stats)
+    attempts = []
+
+    def throttle_first_attempt(request, **kwargs):
+        attempts.append(request)
+        if len(attempts) == 1:
+            body = b'{"__type": "ThrottlingException", "message": "Rate exceeded"}'
+            return AWSResponse(request.url, 400, {}, Mock(stream=lambda: [body]))
+        return None
+
+    client.meta.events.register_first('before-send', throttle_first_attempt)
+    mocker.patch('botocore.endpoint.time.sleep')
+    client.describe_parameters()
+
+    assert len(attempts) == 2
+    describe_parameters = stats.reset()[('ssm', 'DescribeParameters')]
+    assert describe_parameters.calls == 1
+    assert describe_parameters.retries == 1
+    assert describe_parameters.throttles == 1
+    assert describe_parameters.errors == 0
+
+
+def test_boto_clients_instrumented(ssm) -> None:
+    aws_call_stats.reset()
+
+    boto_clients.get_client('ssm').describe_parameters()
+
+    assert aws_call_stats.snapshot()[('ssm', 'DescribeParameters')].calls == 1
+    aws_call_stats.reset()
+
+
+def test_add_aws_call_metrics() -> None:
+    stats = AwsCallStats()
+    stats.record('dynamodb', 'GetItem', 12.5, response_bytes=100)
+    stats.record('dynamodb', 'GetItem', 7.5, retries=2, throttles=1)
+    metrics = Mock()
+    logger = Mock()
+
+    add_aws_call_metrics(metrics, logger, stats)
+
+    assert [c.kwargs for c in metrics.add_metric.call_args_list] == [
+        {'name': 'dynamodb.GetItem.calls', 'unit': 'Count', 'value': 2},
+        {'name': 'dynamodb.GetItem.duration', 'unit': 'Milliseconds', 'value': 20.0},
+        {'name': 'dynamodb.GetItem.throttles', 'unit': 'Count', 'value': 1},
+        {'name': 'dynamodb.GetItem.retries', 'unit': 'Count', 'value': 2},
+    ]
+    logger.info.assert_called_once_with({
+        'msg': 'AWS call summary',
+        'aws_calls': {
+            'dynamodb.GetItem': {
+                'calls': 2, 'errors': 0, 'throttles': 1, 'retries': 2,
+                'total_ms': 20.0, 'max_ms': 12.5, 'request_bytes': 0,
+                'response_bytes': 100,
+            },
+        },
+    })
+    assert stats.snapshot() == {}
+
+
+def test_add_aws_call_metrics_no_calls() -> None:
+    metrics = Mock()
+    logger = Mock()
+
+    add_aws_call_metrics(metrics, logger, AwsCallStats())
+
+    metrics.add_metric.assert_not_called()
+    logger.info.assert_not_called()
+
+
+def test_operation_stats_snapshot_is_copy() -> None:
+    stats = AwsCallStats()
+    stats.record('sns', 'Publish', 1.0)
+    snapshot = stats.snapshot()
+    stats.record('sns', 'Publish', 1.0)
+
+    assert snapshot[('sns', 'Publish')] == OperationStats(calls=1, total_ms=1.0, max_ms=1.0)
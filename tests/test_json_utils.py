@@ -0,0 +1,116 @@
+from dataclasses import dataclass
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+from enum import Enum
+import io
+import json
+from typing import Any, List
+
+import pytest
+
+from ppaya_lambda_utils import json_utils
+
+
+class Colour(Enum):
+    RED = 'red'
+
+
+@dataclass
+class Point:
+    x: int
+    y: Decimal
+
+
+@pytest.fixture(params=['json', 'orjson'], autouse=True)
+def json_backend(request):
+    json_utils.set_json_backend(request.param)
+    yield request.param
+    json_utils.set_json_backend()
+
+
+def test_dumps() -> None:
+    obj = {
+        'decimal': Decimal('2.60'),
+        'datetime': datetime(2022, 3, 4, 5, 6, 7, 8, tzinfo=timezone.utc),
+        'naive_datetime': datetime(2022, 3, 4, 5, 6, 7),
+        'date': date(2022, 3, 4),
+        'time': time(5, 6, 7),
+        'enum': Colour.RED,
+        'dataclass': Point(x=1, y=Decimal('1.5')),
+        'list': [1, 2.5, None, True, 'ü'],
+        1: 'int key',
+    }
+
+    assert json.loads(json_utils.dumps(obj)) == {
+        'decimal': '2.60',
+        'datetime': '2022-03-04T05:06:07.000008+00:00',
+        'naive_datetime': '2022-03-04T05:06:07',
+        'date': '2022-03-04',
+        'time': '05:06:07',
+        'enum': 'red',
+        'dataclass': {'x': 1, 'y': '1.5'},
+        'list': [1, 2.5, None, True, 'ü'],
+        '1': 'int key',
+    }
+
+
+def test_dumps_is_compact() -> None:
+    assert json_utils.dumps({'x': [1, 2]}) == '{"x":[1,2]}'
+
+
+def test_dumps_with_large_integer() -> None:
+    assert json_utils.dumps({'x': 2 ** 70}) == '{"x":%d}' % 2 ** 70
+
+
+def test_dumps_with_unsupported_type() -> None:
+    with pytest.raises(TypeError):
+        json_utils.dumps({'x': object()})
+
+
+def test_dumps_bytes() -> None:
+    assert json_utils.dumps_bytes({'x': 'ü'}) == '{"x":"ü"}'.encode('utf-8')
+
+
+def test_loads() -> None:
+    assert json_utils.loads('{"x": [1, 2.5]}') == {'x': [1, 2.5]}
+    assert json_utils.loads(b'{"x": [1, 2.5]}') == {'x': [1, 2.5]}
+
+
+def test_get_json_backend(json_backend) -> None:
+    assert json_utils.get_json_backend() == json_backend
+
+
+def test_set_json_backend_with_unknown_backend() -> None:
+    with pytest.raises(ValueError):
+        json_utils.set_json_backend('simplejson')
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 1024])
+def test_iter_json_array(chunk_size) -> None:
+    items: List[Any] = [{'x': x, 'y': 'ü' * x, 'z': [1.5, None, True]} for x in range(50)]
+    items += [123456789, 'text', [], {}]
+    stream = io.BytesIO(json.dumps(items, ensure_ascii=False).encode('utf-8'))
+
+    assert list(json_utils.iter_json_array(stream, chunk_size)) == items
+
+
+def test_iter_json_array_with_text_stream() -> None:
+    stream = io.StringIO(' [1, 22 ,333] ')
+
+    assert list(json_utils.iter_json_array(stream, 1)) == [1, 22, 333]
+
+
+@pytest.mark.parametrize(
+    'data', ['[1.5, 2]', '[1e5, 3]', '[-12, -0.25, 1.5E-3]', '[123.456, 7890]'])
+def test_iter_json_array_with_split_numbers(data) -> None:
+    assert list(json_utils.iter_json_array(io.StringIO(data), 1)) == json.loads(data)
+
+
+def test_iter_json_array_with_empty_array() -> None:
+    assert list(json_utils.iter_json_array(io.BytesIO(b'[ ]'))) == []
+
+
+@pytest.mark.parametrize('data', [b'{"x": 1}', b'[1, 2', b'[1 2]', b'[1, }', b''])
+def test_iter_json_array_with_invalid_array(data) -> None:
+    with pytest.raises(ValueError):
+        list(json_utils.iter_json_array(io.BytesIO(data), 1))
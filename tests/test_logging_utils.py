@@ -0,0 +1,93 @@
+import json
+import logging
+from unittest.mock import Mock
+
+from aws_lambda_powertools import Logger
+import pytest
+
+from ppaya_lambda_utils.logging_utils import (
+    get_log_policy, LazyLogger, log_payload, LOG_MAX_FIELD_BYTES_ENV_VAR,
+    LOG_PAYLOAD_SAMPLE_RATE_ENV_VAR, LogPolicy, set_log_policy, truncate_field)
+
+
+def test_lazy_logger(monkeypatch) -> None:
+    monkeypatch.delenv('POWERTOOLS_SERVICE_NAME')
+    logger = LazyLogger('my_logger')
+    assert logger._logger is None
+
+    logger.info({'msg': 'Hello'})
+
+    assert logger._logger is logging.getLogger('my_logger')
+
+
+@pytest.fixture
+def log_policy():
+    policy = LogPolicy(max_field_bytes=20)
+    set_log_policy(policy)
+    yield policy
+    set_log_policy()
+
+
+def test_truncate_field() -> None:
+    assert truncate_field({'a': 1}, 20) == '{"a":1}'
+    assert truncate_field(1.5, 20) == 1.5
+    assert truncate_field(b'abc', 20) == 'abc'
+    assert truncate_field('x' * 30, 20) == 'x' * 20 + '...[truncated 10 bytes]'
+    assert truncate_field({'a': 'x' * 30}, 10) == '{"a":"xxxx...[truncated 28 bytes]'
+
+
+def test_log_payload(log_policy) -> None:
+    logger = Mock()
+    logger.isEnabledFor.return_value = True
+
+    log_payload(logger, logging.ERROR, 'Failed', event={'body': 'x' * 30}, count=1)
+
+    logger.error.assert_called_once_with({
+        'msg': 'Failed',
+        'event': '{"body":"' + 'x' * 11 + '...[truncated 21 bytes]',
+        'count': 1,
+    }, stacklevel=2)
+
+
+def test_log_payload_location(capsys) -> None:
+    logger = Logger(service='test')
+    set_log_policy()
+
+    log_payload(logger, logging.INFO, 'Publishing', body={'a': 1})
+
+    record = json.loads(capsys.readouterr().out)
+    assert record['location'] == 'test_log_payload_location:{}'.format(
+        test_log_payload_location.__code__.co_firstlineno + 4)
+    assert record['message']['body'] == '{"a":1}'
+
+
+def test_log_payload_level_disabled(log_policy, mocker) -> None:
+    logger = Mock()
+    logger.isEnabledFor.return_value = False
+    dumps = mocker.patch('ppaya_lambda_utils.json_utils.dumps')
+
+    log_payload(logger, logging.INFO, 'Publishing', body={'a': 1})
+
+    logger.info.assert_not_called()
+    dumps.assert_not_called()
+
+
+def test_log_payload_sampled(log_policy) -> None:
+    log_policy.info_sample_rate = 0
+    logger = Mock()
+    logger.isEnabledFor.return_value = True
+
+    log_payload(logger, logging.INFO, 'Publishing', body={'a': 1})
+    log_payload(logger, logging.ERROR, 'Failed', body={'a': 1})
+
+    logger.info.assert_not_called()
+    logger.error.assert_called_once()
+
+
+def test_get_log_policy(monkeypatch) -> None:
+    monkeypatch.setenv(LOG_MAX_FIELD_BYTES_ENV_VAR, '100')
+    monkeypatch.setenv(LOG_PAYLOAD_SAMPLE_RATE_ENV_VAR, '0.1')
+    set_log_policy()
+
+    assert get_log_policy() == LogPolicy(max_field_bytes=100, info_sample_rate=0.1)
+    set_log_policy()
@@ -1,9 +1,14 @@
-from unittest.mock import Mock
+import json
+from unittest.mock import MagicMock, Mock
 
 from aws_lambda_powertools import Logger, Metrics
 import pytest
 
-from ppaya_lambda_utils.middleware import observability_init_middleware
+from ppaya_lambda_utils import middleware
+from ppaya_lambda_utils.middleware import (
+    idempotency_middleware, notification_flush_middleware, observability_init_middleware,
+    profiling_middleware, sqs_batch_middleware)
+from ppaya_lambda_utils.stores.idempotency import IdempotencyStore
 
 
 logger = Logger()
@@ -42,3 +47,146 @@ def test_observability_init_middleware_ok(lambda_event) -> None:
 def test_observability_init_middleware_fail(lambda_event) -> None:
     with pytest.raises(ValueError):
         my_handler_fail(lambda_event, Mock())
+
+
+def test_observability_init_middleware_performance_metrics(lambda_event, monkeypatch) -> None:
+    monkeypatch.setattr(middleware, '_cold_start', True)
+    mock_metrics = Mock()
+    context = Mock()
+    context.get_remaining_time_in_millis.return_value = 2500
+
+    @observability_init_middleware(logger=Mock(), metrics=mock_metrics)
+    def handler(event, context):
+        return {'result': 'OK'}
+
+    handler(lambda_event, context)
+    handler(lambda_event, context)
+
+    metric_calls = [c.kwargs for c in mock_metrics.add_metric.call_args_list]
+    names = [c['name'] for c in metric_calls]
+    assert names == [
+        'function_succeeded', 'function_duration', 'cold_start', 'init_duration',
+        'peak_memory', 'remaining_time',
+        'function_succeeded', 'function_duration', 'cold_start',
+        'peak_memory', 'remaining_time',
+    ]
+    assert [c['value'] for c in metric_calls if c['name'] == 'cold_start'] == [1, 0]
+    assert metric_calls[-1] == {'name': 'remaining_time', 'unit': 'Milliseconds', 'value': 2500}
+    assert all(c['value'] >= 0 for c in metric_calls)
+
+
+def test_sqs_batch_middleware() -> None:
+    processed = []
+
+    @sqs_batch_middleware(max_workers=2)
+    def handler(message, record):
+        if message['id'] == 2:
+            raise ValueError('Ooops')
+        processed.append(message['id'])
+
+    event = {'Records': [
+        {'messageId': f'message-{x}', 'body': json.dumps({'id': x})} for x in range(4)]}
+    result = handler(event, Mock())
+
+    assert result == {'batchItemFailures': [{'itemIdentifier': 'message-2'}]}
+    assert sorted(processed) == [0, 1, 3]
+
+
+def allocate(size):
+    return [x for x in range(size)]
+
+
+def test_profiling_middleware(lambda_event, monkeypatch) -> None:
+    monkeypatch.setenv(middleware.PROFILING_ENABLED_ENV_VAR, 'true')
+    monkeypatch.setenv(middleware.PROFILING_SAMPLE_RATE_ENV_VAR, '1')
+    monkeypatch.setenv(middleware.PROFILING_TOP_N_ENV_VAR, '5')
+    mock_logger = Mock()
+    retained = []
+
+    @profiling_middleware(logger=mock_logger)
+    def handler(event, context):
+        retained.append(allocate(100_000))
+        return {'result': 'OK'}
+
+    assert handler(lambda_event, Mock()) == {'result': 'OK'}
+
+    profile = mock_logger.info.call_args.args[0]
+    assert profile['msg'] == 'Invocation profile'
+    assert len(profile['functions']) == 5
+    assert any('(allocate)' in x['function'] for x in profile['functions'])
+    assert 0 < len(profile['allocations']) <= 5
+    assert 'test_middleware.py' in profile['allocations'][0]['location']
+    assert profile['peak_traced_memory_kb'] > 0
+
+
+@pytest.mark.parametrize('enabled, sample_rate', [('false', '1'), ('true', '0')])
+def test_profiling_middleware_not_sampled(lambda_event, monkeypatch, enabled, sample_rate) -> None:
+    monkeypatch.setenv(middleware.PROFILING_ENABLED_ENV_VAR, enabled)
+    monkeypatch.setenv(middleware.PROFILING_SAMPLE_RATE_ENV_VAR, sample_rate)
+    mock_logger = Mock()
+
+    @profiling_middleware(logger=mock_logger)
+    def handler(event, context):
+        return {'result': 'OK'}
+
+    assert handler(lambda_event, Mock()) == {'result': 'OK'}
+    mock_logger.info.assert_not_called()
+
+
+def test_idempotency_middleware(dynamodb_table) -> None:
+    calls = []
+
+    class MyIdempotencyStore(IdempotencyStore):
+        table_name = 'test-table'
+
+    @idempotency_middleware(store=MyIdempotencyStore(), event_key_jmespath='id')
+    def handler(event, context):
+        calls.append(event)
+        if event['id'] == 'fail':
+            raise ValueError('Ooops')
+        return {'result': event['id']}
+
+    context = Mock()
+    context.get_remaining_time_in_millis.return_value = 2500
+
+    assert handler({'id': 'a', 'attempt': 1}, context) == {'result': 'a'}
+    assert handler({'id': 'a', 'attempt': 2}, context) == {'result': 'a'}
+    assert handler({'id': 'b'}, context) == {'result': 'b'}
+    for __ in range(2):
+        with pytest.raises(ValueError):
+            handler({'id': 'fail'}, context)
+    assert [event['id'] for event in calls] == ['a', 'b', 'fail', 'fail']
+
+
+def test_notification_flush_middleware(lambda_event) -> None:
+    client = MagicMock()
+
+    @notification_flush_middleware(client=client)
+    def handler(event, context):
+        client.__enter__.assert_called_once_with()
+        client.__exit__.assert_not_called()
+        return {'result': 'OK'}
+
+    assert handler(lambda_event, Mock()) == {'result': 'OK'}
+    client.__exit__.assert_called_once_with(None, None, None)
+
+
+def test_idempotency_middleware_with_unserializable_result(dynamodb_table) -> None:
+    calls = []
+
+    class MyIdempotencyStore(IdempotencyStore):
+        table_name = 'test-table'
+
+    @idempotency_middleware(store=MyIdempotencyStore())
+    def handler(event, context):
+        calls.append(event)
+        return {1, 2}
+
+    context = Mock()
+    context.get_remaining_time_in_millis.return_value = 2500
+
+    for __ in range(2):
+        with pytest.raises(TypeError, match='not JSON serializable'):
+            handler({'id': 'a'}, context)
+    # The in progress record was released, so the retry wasn't rejected.
+    assert len(calls) == 2
@@ -1,9 +1,16 @@
-from datetime import datetime
+from datetime import datetime, timezone
+import json
+from typing import Any, Dict, List
+from unittest.mock import Mock
 
 import pytest
 
+from ppaya_lambda_utils.boto_utils import boto_clients
+from ppaya_lambda_utils.exceptions import NotificationPublishException
+from ppaya_lambda_utils.boto_utils import to_sns_json_message
 from ppaya_lambda_utils.notification_utils import (
-    NotificationClient, to_notification_display_datetime)
+    get_display_datetime_formatter, NotificationClient, split_customer_notification,
+    to_notification_display_datetime)
 from ppaya_lambda_utils.testing_utils import load_sns_message_from_sqs
 
 
@@ -47,6 +54,179 @@ def test_send_customer_notification(sns_topic, sns_subscription) -> None:
     }
 
 
+def test_send_notifications_buffered(sns_topic, sns_subscription) -> None:
+    client = NotificationClient(sns_topic.arn)
+    with client:
+        for x in range(12):
+            client.send_admin_notification('my_template', 'My Subject', {'x': x})
+        assert sns_subscription.receive_messages() == []
+
+    messages: List[Any] = []
+    while received := sns_subscription.receive_messages(MaxNumberOfMessages=10):
+        messages.extend(received)
+    published_messages = [load_sns_message_from_sqs(message) for message in messages]
+    assert sorted(message['event']['context']['x'] for message in published_messages) == list(
+        range(12))
+    assert all(
+        datetime.fromisoformat(message['timestamp']) for message in published_messages)
+    assert all(
+        json.loads(message.body)['MessageAttributes']['event_type']['Value'] == 'notify'
+        for message in messages)
+
+    # Published immediately after the block.
+    client.send_admin_notification('my_template', 'My Subject')
+    assert len(sns_subscription.receive_messages()) == 1
+
+
+def test_send_notifications_buffered_nested(mocker, sns_topic, sns_subscription) -> None:
+    publish_to_sns = mocker.patch('ppaya_lambda_utils.notification_utils.publish_to_sns')
+    client = NotificationClient(sns_topic.arn)
+    with client:
+        with client:
+            client.send_admin_notification('my_template', 'My Subject', {'x': 0})
+        client.send_admin_notification('my_template', 'My Subject', {'x': 1})
+        assert sns_subscription.receive_messages() == []
+
+    publish_to_sns.assert_not_called()
+    assert len(sns_subscription.receive_messages(MaxNumberOfMessages=10)) == 2
+
+
+def test_send_notifications_buffered_with_failure(mocker) -> None:
+    sns = Mock()
+    sns.publish_batch.return_value = {
+        'Successful': [{'Id': '0', 'MessageId': 'a'}],
+        'Failed': [{'Id': '1', 'SenderFault': True, 'Code': 'InvalidParameter'}],
+    }
+    mocker.patch.object(boto_clients, 'get_client', return_value=sns)
+    client = NotificationClient('topic-arn')
+
+    with pytest.raises(NotificationPublishException) as exc_info:
+        with client:
+            client.send_admin_notification('my_template', 'My Subject')
+            client.send_admin_notification('my_template', 'My Subject')
+
+    assert [failure['Id'] for failure in exc_info.value.failed] == ['1']
+
+
+def test_send_notifications_buffered_with_too_large(sns_topic, sns_subscription) -> None:
+    client = NotificationClient(sns_topic.arn)
+    client.max_message_bytes = 1024
+
+    with pytest.raises(NotificationPublishException) as exc_info:
+        with client:
+            client.send_admin_notification('my_template', 'My Subject', {'x': 0})
+            client.send_admin_notification('my_template', 'My Subject', {'x': 'x' * 300000})
+            client.send_admin_notification('my_template', 'My Subject', {'x': 2})
+
+    assert [failure['Id'] for failure in exc_info.value.failed] == ['1']
+    assert exc_info.value.failed[0]['Code'] == 'BatchEntryTooLargeException'
+    published_messages = [
+        load_sns_message_from_sqs(message)
+        for message in sns_subscription.receive_messages(MaxNumberOfMessages=10)]
+    assert sorted(message['event']['context']['x'] for message in published_messages) == [0, 2]
+
+    # Published immediately after the block.
+    client.send_admin_notification('my_template', 'My Subject')
+    assert len(sns_subscription.receive_messages()) == 1
+
+
+def test_send_notifications_buffered_with_flush_error(mocker) -> None:
+    sns = Mock()
+    mocker.patch.object(boto_clients, 'get_client', return_value=sns)
+    mocker.patch(
+        'ppaya_lambda_utils.notification_utils.publish_batch_to_sns',
+        side_effect=ValueError('Flush failed'))
+    client = NotificationClient('topic-arn')
+
+    with pytest.raises(ValueError, match='Flush failed'):
+        with client:
+            client.send_admin_notification('my_template', 'My Subject')
+            client.send_admin_notification('my_template', 'My Subject')
+
+    # The exception raised in the block isn't hidden by the flush error.
+    with pytest.raises(KeyError):
+        with client:
+            client.send_admin_notification('my_template', 'My Subject')
+            client.send_admin_notification('my_template', 'My Subject')
+            raise KeyError('Handler failed')
+
+    # The client isn't left buffering.
+    client.send_admin_notification('my_template', 'My Subject')
+    sns.publish.assert_called_once()
+
+
+def test_split_customer_notification() -> None:
+    recipients = [f'user{x}@ppaya.co.uk' for x in range(100)]
+    event: Dict[str, Any] = {
+        'notification_type': 'CUSTOMER_EMAIL',
+        'template_name': 'my_template',
+        'subject': 'My Subject',
+        'recipients': recipients,
+        'context': {'a': 1},
+        'recipients_context': {
+            recipient: {'name': f'User "{x}"'} for x, recipient in enumerate(recipients[::2])},
+    }
+
+    events = split_customer_notification(event, 2048)
+
+    assert len(events) > 1
+    assert [r for chunk in events for r in chunk['recipients']] == recipients
+    for chunk in events:
+        assert chunk['context'] == {'a': 1}
+        assert chunk['recipients_context'] == {
+            r: event['recipients_context'][r]
+            for r in chunk['recipients'] if r in event['recipients_context']}
+        msg = {'timestamp': datetime.now(timezone.utc).isoformat(), 'event': chunk}
+        assert len(to_sns_json_message(msg).encode('utf-8')) <= 2048
+    assert split_customer_notification(event, 256 * 1024) == [event]
+
+
+def test_send_customer_notification_split(sns_topic, sns_subscription) -> None:
+    recipients = [f'user{x}@ppaya.co.uk' for x in range(100)]
+    client = NotificationClient(sns_topic.arn)
+    client.max_message_bytes = 2048
+    client.send_customer_notification(
+        'my_template', 'My Subject', recipients, {'a': 1},
+        {recipient: {'x': x} for x, recipient in enumerate(recipients)})
+
+    published_messages: List[Any] = []
+    while received := sns_subscription.receive_messages(MaxNumberOfMessages=10):
+        published_messages.extend(load_sns_message_from_sqs(x) for x in received)
+    assert len(published_messages) > 1
+    assert sorted(
+        r for message in published_messages for r in message['event']['recipients']
+    ) == sorted(recipients)
+    for message in published_messages:
+        assert message['event']['recipients_context'] == {
+            r: {'x': recipients.index(r)} for r in message['event']['recipients']}
+
+
+def test_send_customer_notification_split_with_too_large(sns_topic, sns_subscription) -> None:
+    recipients = [f'user{x}@ppaya.co.uk' for x in range(200)]
+    recipients_context: Dict[str, Dict[str, Any]] = {
+        recipient: {'x': x} for x, recipient in enumerate(recipients)}
+    recipients_context['user7@ppaya.co.uk'] = {'x': 'x' * 300 * 1024}
+    client = NotificationClient(sns_topic.arn)
+    client.max_message_bytes = 4096
+
+    with pytest.raises(NotificationPublishException) as exc_info:
+        client.send_customer_notification(
+            'my_template', 'My Subject', recipients, {'a': 1}, recipients_context)
+
+    assert len(exc_info.value.failed) == 1
+    failure = exc_info.value.failed[0]
+    assert failure['Code'] == 'BatchEntryTooLargeException'
+    message = json.loads(json.loads(failure['Entry']['Message'])['default'])
+    assert message['event']['recipients'] == [
+        'user7@ppaya.co.uk']
+    published_messages: List[Any] = []
+    while received := sns_subscription.receive_messages(MaxNumberOfMessages=10):
+        published_messages.extend(load_sns_message_from_sqs(x) for x in received)
+    assert sorted(
+        r for message in published_messages for r in message['event']['recipients']
+    ) == sorted(r for r in recipients if r != 'user7@ppaya.co.uk')
+
+
 @pytest.mark.parametrize(
     'dt_iso, expected', [
         ('2021-10-29T12:45:00+01:00', '29 Oct 2021, 12:45 PM (BST)'),
@@ -57,3 +237,19 @@ def test_send_customer_notification(sns_topic, sns_subscription) -> None:
 def test_to_notification_display_datetime(dt_iso, expected) -> None:
     dt = datetime.fromisoformat(dt_iso)
     assert to_notification_display_datetime(dt) == expected
+
+
+def test_display_datetime_formatter_format_many() -> None:
+    formatter = get_display_datetime_formatter('Europe/London')
+    dts = [
+        datetime.fromisoformat('2021-10-29T12:45:00+01:00'),
+        datetime.fromisoformat('2022-11-29T12:45:00'),
+        datetime.fromisoformat('2021-10-29T11:45:00+00:00'),
+    ]
+
+    assert formatter.format_many(dts) == [
+        '29 Oct 2021, 12:45 PM (BST)',
+        '29 Nov 2022, 12:45 PM (GMT)',
+        '29 Oct 2021, 12:45 PM (BST)',
+    ]
+    assert get_display_datetime_formatter('Europe/London') is formatter
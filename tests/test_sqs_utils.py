@@ -0,0 +1,84 @@
+import json
+import threading
+
+from ppaya_lambda_utils.boto_utils import to_sns_json_message
+from ppaya_lambda_utils.sqs_utils import decode_sqs_message, process_sqs_batch
+from ppaya_lambda_utils.testing_utils import create_sqs_event
+
+
+def create_record(message_id, body, group_id=None):
+    record = {'messageId': message_id, 'body': body, 'attributes': {}}
+    if group_id:
+        record['attributes']['MessageGroupId'] = group_id
+    return record
+
+
+def test_decode_sqs_message() -> None:
+    message = {'id': 1, 'name': 'ü'}
+    sns_notification = json.dumps({'Type': 'Notification', 'Message': json.dumps(message)})
+    sns_json_structure = json.dumps(
+        {'Type': 'Notification', 'Message': to_sns_json_message(message)})
+    not_sns = {'Message': 'order shipped', 'order_id': 1}
+
+    assert decode_sqs_message(create_sqs_event(message)['Records'][0]) == message
+    assert decode_sqs_message({'body': sns_notification}) == message
+    assert decode_sqs_message({'body': sns_json_structure}) == message
+    assert decode_sqs_message({'body': json.dumps(message)}) == message
+    assert decode_sqs_message({'body': 'not json'}) == 'not json'
+    assert decode_sqs_message({'body': json.dumps(not_sns)}) == not_sns
+
+
+def test_process_sqs_batch() -> None:
+    threads = set()
+
+    def handler(message, record):
+        threads.add(threading.get_ident())
+        if message['id'] % 3 == 0:
+            raise ValueError('Ooops')
+
+    event = {'Records': [
+        create_record(f'message-{x}', json.dumps({'id': x})) for x in range(10)]}
+
+    result = process_sqs_batch(event, handler, max_workers=4)
+
+    assert sorted(x['itemIdentifier'] for x in result['batchItemFailures']) == [
+        'message-0', 'message-3', 'message-6', 'message-9']
+    assert len(threads) > 1
+
+
+def test_process_sqs_batch_fifo() -> None:
+    processed = []
+
+    def handler(message, record):
+        if message == 'a-2':
+            raise ValueError('Ooops')
+        processed.append(message)
+
+    event = {'Records': [
+        create_record(f'{group}-{x}', json.dumps(f'{group}-{x}'), group)
+        for group in ('a', 'b') for x in range(4)]}
+
+    result = process_sqs_batch(event, handler)
+
+    # Following records of a failed group are not processed.
+    assert result == {'batchItemFailures': [
+        {'itemIdentifier': 'a-2'}, {'itemIdentifier': 'a-3'}]}
+    # Records are processed in order within each group.
+    assert [x for x in processed if x.startswith('a')] == ['a-0', 'a-1']
+    assert [x for x in processed if x.startswith('b')] == ['b-0', 'b-1', 'b-2', 'b-3']
+
+
+def test_process_sqs_batch_deadline() -> None:
+    event = {'Records': [create_record('message-1', '{}')]}
+
+    def handler(message, record):
+        raise AssertionError('Not called')
+
+    result = process_sqs_batch(
+        event, handler, get_remaining_time_ms=lambda: 500, min_remaining_time_ms=1000)
+
+    assert result == {'batchItemFailures': [{'itemIdentifier': 'message-1'}]}
+
+
+def test_process_sqs_batch_empty() -> None:
+    assert process_sqs_batch({}, print) == {'batchItemFailures': []}